@@ -0,0 +1,88 @@
+"""Passenger arrival schedules drawn up front from a time-varying rate.
+
+Arrivals follow a non-homogeneous Poisson process. arrival_schedule()
+samples the whole schedule of a run in blocks, by thinning a homogeneous
+process at the curve's peak rate, and returns the sorted arrival times the
+simulation then releases as its clock passes them. Rate curves are plain
+callables of time in passengers per second with a peak() bound, so new
+profiles slot in next to DecayingRate and RushHourRate.
+"""
+import itertools
+import math
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Candidate arrivals drawn per block, on top of the expected count
+BLOCK_MARGIN = 16
+
+
+class DecayingRate:
+    """Rate falling linearly from twice `base_rate` at time 0 to `base_rate` at the cutoff, then zero"""
+
+    def __init__(self, base_rate, cutoff):
+        self.base_rate = base_rate  # Passengers per second
+        self.cutoff = cutoff
+
+    def __call__(self, time):
+        # Written with arithmetic only so it works on floats and NumPy arrays alike
+        return self.base_rate * (2.0 - time / self.cutoff) * (time < self.cutoff)
+
+    def peak(self, start, end):
+        """Upper bound of the rate over [start, end)"""
+        return self(max(start, 0.0))
+
+
+class RushHourRate:
+    """Constant background rate plus Gaussian rush-hour peaks
+
+    `peaks` is a list of (centre time, width, extra passengers per second).
+    """
+
+    def __init__(self, base_rate, peaks):
+        self.base_rate = base_rate
+        self.peaks = list(peaks)
+
+    def __call__(self, time):
+        exp = np.exp if np is not None else math.exp
+        rate = self.base_rate
+        for centre, width, height in self.peaks:
+            rate = rate + height * exp(-0.5 * ((time - centre) / width) ** 2)
+        return rate
+
+    def peak(self, start, end):
+        """Upper bound of the rate over [start, end)"""
+        return self.base_rate + sum(height for _, _, height in self.peaks)
+
+
+def arrival_schedule(rate, start, end, stream):
+    """Sorted arrival times in [start, end) for the rate curve `rate`, drawn from `stream`
+
+    Candidates come from a Poisson process at rate.peak(start, end) and
+    each is kept with probability rate(t) / peak. Draws are made a block at
+    a time and the acceptance test runs vectorised when NumPy is present;
+    the same draws are consumed either way, so a seed gives the same
+    schedule with or without NumPy.
+    """
+    peak = rate.peak(start, end)
+    if peak <= 0 or end <= start:
+        return []
+
+    block = int(peak * (end - start)) + BLOCK_MARGIN
+    times = []
+    time = start
+    while time < end:
+        gaps = stream.exponential_block(block, peak)
+        thresholds = stream.random_block(block)
+        candidates = [time + offset for offset in itertools.accumulate(gaps)]
+
+        if np is not None:
+            candidate_array = np.array(candidates)
+            keep = (candidate_array < end) & (np.array(thresholds) * peak < rate(candidate_array))
+            times.extend(candidate_array[keep].tolist())
+        else:
+            times.extend(t for t, u in zip(candidates, thresholds) if t < end and u * peak < rate(t))
+        time = candidates[-1]
+    return times
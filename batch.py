@@ -0,0 +1,336 @@
+"""Monte Carlo replications and parameter sweeps of the headless simulation.
+
+run_batch() runs independent seeded replications in worker processes,
+collects the per-run metrics and summarises each one with a confidence
+interval for its mean. run_sweep() fans grid or Latin-hypercube
+configurations out over the same kind of pool and streams one tidy row
+per (configuration, replication). run_forked() does the same for
+scenarios that share a warm-up: the warm-up is simulated once per
+replication and every configuration carries on from its state.
+"""
+import argparse
+import csv
+import dataclasses
+import itertools
+import math
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from events import EventSimulation
+from simulation import Simulation, SimulationConfig
+
+# Per-run metrics collected from Simulation.summary()
+METRICS = ["avg_wait_time", "avg_turnaround_time", "bus_utilization", "passengers_served", "completed"]
+
+ENGINES = {
+    "event": EventSimulation,
+    "fixed": Simulation,
+}
+
+# Keys of a params dict that choose how to run rather than what to simulate
+RUN_OPTIONS = {"engine", "duration"}
+
+# SimulationConfig fields fixed by a shared warm-up: the fleet layout and the arrival schedule drawn at its start
+WARMUP_FIELDS = {"fleet_size", "bus_stops", "routes", "passenger_generation_rate", "passenger_generation_cutoff",
+                 "arrival_rate"}
+
+# Replication -> state at the end of its warm-up, inherited by forked workers or set by init_warm_states()
+warm_states = {}
+
+
+def field_type(name):
+    """Declared type of a SimulationConfig field"""
+    return {field.name: field.type for field in dataclasses.fields(SimulationConfig)}[name]
+
+
+def make_config(params):
+    """SimulationConfig from the config fields in `params`, ignoring the run options"""
+    return SimulationConfig(**{name: value for name, value in params.items() if name not in RUN_OPTIONS})
+
+
+def run_duration(params, config):
+    """Simulated seconds to run `config` for, refusing a "duration" past its time limit"""
+    duration = params.get("duration")
+    if duration is not None and duration > config.max_simulation_time:
+        raise ValueError(f"duration {duration} is past max_simulation_time {config.max_simulation_time}; "
+                         f"raise max_simulation_time to run longer")
+    return duration
+
+
+def run_replication(seed, params=None):
+    """Run one seeded replication and return its metrics"""
+    params = params or {}
+    config = make_config(params)
+    simulation = ENGINES[params.get("engine", "event")](config, seed=seed)
+    summary = simulation.run_headless(run_duration(params, config))
+
+    metrics = {name: summary[name] for name in METRICS}
+    metrics["seed"] = seed
+    return metrics
+
+
+def t_coverage(t, df):
+    """P(|T| < t) for Student's t with a whole number `df` of degrees of freedom (Abramowitz & Stegun 26.7.3-4)"""
+    theta = math.atan(t / math.sqrt(df))
+    cos2 = math.cos(theta) ** 2
+    term = total = 1.0
+    if df % 2:
+        if df == 1:
+            return 2 * theta / math.pi
+        for k in range(1, (df - 1) // 2):
+            term *= 2 * k / (2 * k + 1) * cos2
+            total += term
+        return 2 / math.pi * (theta + math.sin(theta) * math.cos(theta) * total)
+    for k in range(1, df // 2):
+        term *= (2 * k - 1) / (2 * k) * cos2
+        total += term
+    return math.sin(theta) * total
+
+
+def t_critical(confidence, df):
+    """Two-sided Student t critical value, inverting t_coverage() by bisection on the angle atan(t / sqrt(df))"""
+    if df <= 0:
+        return math.inf
+    low, high = 0.0, math.pi / 2
+    for _ in range(60):
+        middle = (low + high) / 2
+        if t_coverage(math.sqrt(df) * math.tan(middle), df) < confidence:
+            low = middle
+        else:
+            high = middle
+    return math.sqrt(df) * math.tan((low + high) / 2)
+
+
+def confidence_interval(values, confidence=0.95):
+    """Mean, standard deviation and confidence interval bounds of a sample"""
+    mean = statistics.fmean(values)
+    if len(values) < 2:
+        return {"mean": mean, "stdev": 0.0, "low": mean, "high": mean}
+
+    stdev = statistics.stdev(values)
+    half_width = t_critical(confidence, len(values) - 1) * stdev / math.sqrt(len(values))
+    return {"mean": mean, "stdev": stdev, "low": mean - half_width, "high": mean + half_width}
+
+
+def run_batch(n_replications, seeds=None, params=None, workers=None, confidence=0.95):
+    """Run `n_replications` seeded replications across a process pool
+
+    `seeds` defaults to 0..n_replications-1. `params` may pick the
+    "engine" ("event" or "fixed") and the simulated "duration" (at most
+    max_simulation_time), and any other keys are SimulationConfig fields.
+    Returns the per-run metrics under "runs" and a confidence interval per
+    metric under "intervals".
+    """
+    seeds = list(seeds) if seeds is not None else list(range(n_replications))
+    if len(seeds) != n_replications:
+        raise ValueError(f"Expected {n_replications} seeds, got {len(seeds)}")
+
+    workers = workers or os.cpu_count() or 1
+    # Hand each worker a few large chunks so short runs aren't dominated by pickling round trips
+    chunksize = max(1, math.ceil(n_replications / (workers * 4)))
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        runs = list(pool.map(run_replication, seeds, [params] * n_replications, chunksize=chunksize))
+
+    intervals = {name: confidence_interval([run[name] for run in runs], confidence) for name in METRICS}
+    return {"runs": runs, "intervals": intervals}
+
+
+def grid(**axes):
+    """Every combination of the given parameter values, e.g. grid(bus_capacity=[5, 10], bus_speed=[80, 100])"""
+    names = list(axes)
+    return [dict(zip(names, values)) for values in itertools.product(*axes.values())]
+
+
+def latin_hypercube(n_samples, ranges, seed=None):
+    """`n_samples` configurations spreading each (low, high) range of `ranges` over equal strata
+
+    Integer SimulationConfig fields are rounded to the nearest whole value.
+    """
+    rng = random.Random(seed)
+    samples = [{} for _ in range(n_samples)]
+    for name, (low, high) in ranges.items():
+        strata = list(range(n_samples))
+        rng.shuffle(strata)
+        for sample, stratum in zip(samples, strata):
+            value = low + (stratum + rng.random()) / n_samples * (high - low)
+            sample[name] = round(value) if field_type(name) is int else value
+    return samples
+
+
+def run_sweep_task(task):
+    config_id, replication, seed, params = task
+    row = {"config": config_id, "replication": replication}
+    row.update({name: value for name, value in params.items() if name not in RUN_OPTIONS})
+    row.update(run_replication(seed, params))
+    return row
+
+
+def run_sweep(configurations, replications=1, base_seed=0, params=None, workers=None, output=None):
+    """Run every configuration `replications` times across a process pool
+
+    Replication r of every configuration uses seed base_seed + r, so
+    configurations are compared on common random numbers. Rows are written
+    to the `output` CSV file object as they arrive, and all rows are
+    returned as a list.
+    """
+    tasks = []
+    for config_id, configuration in enumerate(configurations):
+        task_params = dict(params or {}, **configuration)
+        for replication in range(replications):
+            tasks.append((config_id, replication, base_seed + replication, task_params))
+
+    columns = ["config", "replication", "seed"]
+    for configuration in configurations:
+        columns.extend(name for name in configuration if name not in columns)
+    columns.extend(METRICS)
+
+    writer = None
+    if output is not None:
+        writer = csv.DictWriter(output, fieldnames=columns)
+        writer.writeheader()
+
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, math.ceil(len(tasks) / (workers * 4)))
+    rows = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for row in pool.map(run_sweep_task, tasks, chunksize=chunksize):
+            rows.append(row)
+            if writer is not None:
+                writer.writerow(row)
+                output.flush()
+    return rows
+
+
+def init_warm_states(states):
+    # Pool initializer where workers can't inherit the warm-up states by forking
+    warm_states.update(states)
+
+
+def run_forked_task(task):
+    config_id, replication, params = task
+    state = warm_states[replication]
+    config = dataclasses.replace(state["config"], **{name: value for name, value in params.items()
+                                                     if name not in RUN_OPTIONS})
+    simulation = ENGINES[params.get("engine", "event")](config, seed=state["seed"])
+    simulation.set_state(state)
+    summary = simulation.run_headless(run_duration(params, config))
+
+    row = {"config": config_id, "replication": replication, "seed": state["seed"]}
+    row.update({name: value for name, value in params.items() if name not in RUN_OPTIONS})
+    row.update({name: summary[name] for name in METRICS})
+    return row
+
+
+def run_forked(configurations, warmup, replications=1, base_seed=0, params=None, workers=None, output=None):
+    """Simulate the first `warmup` seconds once per replication, then continue it under every configuration
+
+    Takes the same arguments and produces the same rows as run_sweep(),
+    but each replication's warm-up runs once, in this process, and the
+    configurations branch off its state in the pool. Where processes can
+    fork, the workers inherit the states copy-on-write; elsewhere each
+    worker is handed them once. Configurations may change anything but
+    the WARMUP_FIELDS.
+    """
+    fixed = {name for configuration in configurations for name in configuration} & WARMUP_FIELDS
+    if fixed:
+        raise ValueError(f"Can't vary {', '.join(sorted(fixed))} after a shared warm-up")
+
+    params = params or {}
+    engine = ENGINES[params.get("engine", "event")]
+    warm_states.clear()
+    for replication in range(replications):
+        simulation = engine(make_config(params), seed=base_seed + replication)
+        simulation.run_until(warmup)
+        warm_states[replication] = simulation.get_state()
+
+    tasks = [(config_id, replication, dict(params, **configuration))
+             for config_id, configuration in enumerate(configurations) for replication in range(replications)]
+
+    columns = ["config", "replication", "seed"]
+    for configuration in configurations:
+        columns.extend(name for name in configuration if name not in columns)
+    columns.extend(METRICS)
+
+    writer = None
+    if output is not None:
+        writer = csv.DictWriter(output, fieldnames=columns)
+        writer.writeheader()
+
+    if "fork" in multiprocessing.get_all_start_methods():
+        pool_options = {"mp_context": multiprocessing.get_context("fork")}
+    else:
+        pool_options = {"initializer": init_warm_states, "initargs": (warm_states,)}
+
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, math.ceil(len(tasks) / (workers * 4)))
+    rows = []
+    with ProcessPoolExecutor(max_workers=workers, **pool_options) as pool:
+        for row in pool.map(run_forked_task, tasks, chunksize=chunksize):
+            rows.append(row)
+            if writer is not None:
+                writer.writerow(row)
+                output.flush()
+    return rows
+
+
+def parse_value(name, text):
+    # Parse a command line value with the type of the matching SimulationConfig field
+    return field_type(name)(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run Monte Carlo replications or parameter sweeps of the bus simulation")
+    parser.add_argument("replications", type=int, nargs="?", default=100)
+    parser.add_argument("--engine", choices=sorted(ENGINES), default="event")
+    parser.add_argument("--duration", type=float, default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--grid", action="append", default=[], metavar="NAME=V1,V2,...",
+                        help="sweep a config field over the listed values")
+    parser.add_argument("--range", action="append", default=[], metavar="NAME=LOW:HIGH",
+                        help="config field range for --lhs sampling")
+    parser.add_argument("--lhs", type=int, default=0, metavar="N", help="sweep N Latin-hypercube samples")
+    parser.add_argument("--fork-at", type=float, default=None, metavar="SECONDS",
+                        help="simulate the first SECONDS once per replication and branch the sweep off it")
+    parser.add_argument("--output", type=argparse.FileType("w"), default=None, help="CSV file for sweep rows")
+    args = parser.parse_args()
+
+    params = {"engine": args.engine}
+    if args.duration is not None:
+        params["duration"] = args.duration
+
+    if args.grid or args.lhs:
+        if args.lhs:
+            ranges = {}
+            for spec in args.range:
+                name, bounds = spec.split("=")
+                low, high = bounds.split(":")
+                ranges[name] = (float(low), float(high))
+            configurations = latin_hypercube(args.lhs, ranges, seed=0)
+        else:
+            axes = {}
+            for spec in args.grid:
+                name, values = spec.split("=")
+                axes[name] = [parse_value(name, value) for value in values.split(",")]
+            configurations = grid(**axes)
+
+        if args.fork_at is not None:
+            run_forked(configurations, args.fork_at, args.replications, params=params, workers=args.workers,
+                       output=args.output or sys.stdout)
+        else:
+            run_sweep(configurations, args.replications, params=params, workers=args.workers,
+                      output=args.output or sys.stdout)
+        return
+
+    result = run_batch(args.replications, params=params, workers=args.workers)
+    for name, interval in result["intervals"].items():
+        print(f"{name}: {interval['mean']:.2f} (95% CI {interval['low']:.2f} - {interval['high']:.2f})")
+
+
+# Only run the main function if this script is executed directly
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Compact binary checkpoints of a simulation's state.
+
+Simulation.get_state() reduces a run to plain data: the passenger columns
+as raw bytes, passengers referred to by row index, the buses, queues and
+dispatch index as small tuples, the running statistics, the state of every
+random stream and what is left of the arrival schedule. This module writes
+that data as one zlib-compressed pickle behind a short header and reads it
+back. Files are replaced atomically, so a crash mid-write leaves the
+previous checkpoint intact.
+"""
+import os
+import pickle
+import struct
+import zlib
+
+# File header: magic bytes and the format version
+MAGIC = b"BUSCKPT"
+VERSION = 5
+HEADER = struct.Struct("<7sB")
+
+# zlib level trading size for speed; checkpoints are written mid-run
+COMPRESSION_LEVEL = 1
+
+
+def write_checkpoint(path, state):
+    """Write a state dict from Simulation.get_state() to `path`"""
+    payload = zlib.compress(pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL), COMPRESSION_LEVEL)
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION))
+        file.write(payload)
+    os.replace(temporary_path, path)
+
+
+def read_checkpoint(path):
+    """State dict stored at `path` by write_checkpoint()"""
+    with open(path, "rb") as file:
+        data = file.read()
+    magic, version = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a simulation checkpoint")
+    if version != VERSION:
+        raise ValueError(f"{path} is checkpoint version {version}, expected {VERSION}")
+    return pickle.loads(zlib.decompress(data[HEADER.size:]))
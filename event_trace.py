@@ -0,0 +1,228 @@
+"""Event traces of simulation runs, streamed to disk in batches.
+
+Every passenger arrival, boarding and alighting, every bus arrival at and
+departure from a stop, and the end of the run become one fixed-width
+record each, in time order.
+Records are buffered and written BATCH_SIZE at a time as CSV, Parquet
+(when pyarrow is installed) or a NumPy .npy file that can be opened with
+numpy.load(path, mmap_mode="r"). Nothing but the current batch is held in
+memory, however long the run. CSV and .npy traces can be reopened part
+way, so a run resumed from a checkpoint carries on the trace it was
+writing.
+
+The run's configuration goes alongside in <trace>.json, so a replay can
+lay out the stops and the fleet the trace was recorded with.
+"""
+import csv
+import json
+import os
+import struct
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import pyarrow
+    import pyarrow.parquet as pq
+except ImportError:
+    pyarrow = None
+    pq = None
+
+from history import reopen_csv
+
+# Records buffered before a write
+BATCH_SIZE = 65536
+
+# Event kinds, stored as their index
+EVENT_KINDS = ("arrival", "boarding", "alighting", "bus_arrival", "bus_departure", "run_end")
+EVENT_CODES = {kind: code for code, kind in enumerate(EVENT_KINDS)}
+
+# Record layout as (name, NumPy type); -1 marks a field that doesn't apply to the event
+TRACE_FIELDS = [
+    ("time", "<f8"),  # When the event happened
+    ("kind", "i1"),  # Index into EVENT_KINDS
+    ("passenger_id", "<i4"),
+    ("bus_id", "<i2"),
+    ("stop_index", "<i2"),  # Where it happened; a bus leaving the depot at x = 0 departs from stop -1
+    ("destination_stop", "<i2"),  # The passenger's, or the stop a departing bus heads for
+    ("arrival_time", "<f8"),  # Passenger times known at the event
+    ("planned_ride_time", "<f8"),
+    ("ride_time", "<f8"),
+    ("start_time", "<f8"),
+    ("completion_time", "<f8"),
+]
+FIELD_NAMES = [name for name, _ in TRACE_FIELDS]
+
+
+class TraceWriter:
+    """Buffers trace records and hands them to write_batch() BATCH_SIZE at a time
+
+    With `resume_at`, the first that many records of an existing trace at
+    `path` are kept and the new ones follow them.
+    """
+
+    def __init__(self, path, resume_at=None):
+        self.path = path
+        self.batch = []
+        self.count = resume_at or 0  # Records in the file or buffered so far
+
+    def record(self, time, kind, passenger=None, bus=None, stop_index=-1, destination_stop=-1):
+        """Queue one event; passenger fields are read from `passenger` when given"""
+        if passenger is not None:
+            self.batch.append((time, EVENT_CODES[kind], passenger.id, -1 if bus is None else bus.id, stop_index,
+                               passenger.destination_stop, passenger.arrival_time, passenger.planned_ride_time,
+                               passenger.ride_time, passenger.start_time, passenger.completion_time))
+        else:
+            self.batch.append((time, EVENT_CODES[kind], -1, -1 if bus is None else bus.id, stop_index,
+                               destination_stop, -1.0, -1.0, -1.0, -1.0, -1.0))
+        self.count += 1
+        if len(self.batch) >= BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        if self.batch:
+            self.write_batch(self.batch)
+            self.batch = []
+
+    def write_batch(self, records):
+        raise NotImplementedError
+
+    def close(self):
+        self.flush()
+
+
+class CsvTraceWriter(TraceWriter):
+    """Trace as CSV rows with the event kind spelled out"""
+
+    def __init__(self, path, resume_at=None):
+        super().__init__(path, resume_at)
+        if resume_at is not None:
+            self.file = reopen_csv(path, resume_at)
+            self.writer = csv.writer(self.file)
+        else:
+            self.file = open(path, "w", newline="")
+            self.writer = csv.writer(self.file)
+            self.writer.writerow(FIELD_NAMES)
+
+    def write_batch(self, records):
+        self.writer.writerows((record[0], EVENT_KINDS[record[1]]) + record[2:] for record in records)
+
+    def flush(self):
+        super().flush()
+        self.file.flush()
+
+    def close(self):
+        super().close()
+        self.file.close()
+
+
+class NpyTraceWriter(TraceWriter):
+    """Trace as a 1-D structured .npy array, appended in batches
+
+    The header reserves room for the largest count, so every flush
+    rewrites the record count in place and the file loads part way
+    through a run.
+    """
+
+    def __init__(self, path, resume_at=None):
+        super().__init__(path, resume_at)
+        self.dtype = np.dtype(TRACE_FIELDS)
+        self.header_length = len(self.header(10 ** 18))
+        if resume_at is not None:
+            # The header may count records written after the state was saved, so go by the file size
+            size = self.header_length + resume_at * self.dtype.itemsize
+            if os.path.getsize(path) < size:
+                raise ValueError(f"{path} holds fewer than the {resume_at} records it had when the state was saved")
+            self.file = open(path, "r+b")
+            self.file.truncate(size)
+            self.write_header()
+        else:
+            self.file = open(path, "wb")
+            self.file.write(self.header(0, self.header_length))
+
+    def header(self, count, length=None):
+        """.npy version 1.0 header for `count` records, padded to `length` bytes or the next 64-byte boundary"""
+        text = repr({"descr": np.lib.format.dtype_to_descr(self.dtype), "fortran_order": False, "shape": (count,)})
+        if length is None:
+            # Magic, version and length prefix take 10 bytes, and the header ends in a newline
+            length = -(-(10 + len(text) + 1) // 64) * 64
+        text = text.ljust(length - 10 - 1) + "\n"
+        return b"\x93NUMPY\x01\x00" + struct.pack("<H", len(text)) + text.encode("latin1")
+
+    def write_batch(self, records):
+        self.file.write(np.array(records, dtype=self.dtype).tobytes())
+
+    def write_header(self):
+        """Rewrite the record count at the start of the file, leaving the position at its end"""
+        self.file.seek(0)
+        self.file.write(self.header(self.count - len(self.batch), self.header_length))
+        self.file.seek(0, os.SEEK_END)
+
+    def flush(self):
+        super().flush()
+        self.write_header()
+        self.file.flush()
+
+    def close(self):
+        super().close()
+        self.file.close()
+
+
+class ParquetTraceWriter(TraceWriter):
+    """Trace as a Parquet file, one row group per batch"""
+
+    def __init__(self, path, resume_at=None):
+        if resume_at is not None:
+            raise ValueError("Parquet traces can't be carried on from a saved state, record to .csv or .npy instead")
+        super().__init__(path)
+        types = {"<f8": pyarrow.float64(), "i1": pyarrow.int8(), "<i4": pyarrow.int32(), "<i2": pyarrow.int16()}
+        self.schema = pyarrow.schema([(name, types[type_code]) for name, type_code in TRACE_FIELDS])
+        self.writer = pq.ParquetWriter(path, self.schema)
+
+    def write_batch(self, records):
+        columns = list(zip(*records))
+        self.writer.write_table(pyarrow.Table.from_arrays(
+            [pyarrow.array(column, type=field.type) for column, field in zip(columns, self.schema)],
+            schema=self.schema))
+
+    def close(self):
+        super().close()
+        self.writer.close()
+
+
+def config_path(path):
+    """Where the configuration of the run recorded at `path` is kept"""
+    return f"{path}.json"
+
+
+def read_trace_config(path):
+    """Configuration fields saved with the trace at `path`, or None for a trace without them"""
+    if not os.path.exists(config_path(path)):
+        return None
+    with open(config_path(path)) as file:
+        return json.load(file)
+
+
+def open_trace(path, resume_at=None, config=None):
+    """Trace writer for `path`, picking the format from its extension (.csv, .npy or .parquet)
+
+    `resume_at` keeps that many records of the trace already at `path` and
+    appends after them. `config`, a dict of plain configuration fields, is
+    written alongside for read_trace_config().
+    """
+    if config is not None:
+        with open(config_path(path), "w") as file:
+            json.dump(config, file, indent=2)
+    if path.endswith(".csv"):
+        return CsvTraceWriter(path, resume_at)
+    if path.endswith(".npy"):
+        if np is None:
+            raise ImportError("Writing .npy traces requires numpy")
+        return NpyTraceWriter(path, resume_at)
+    if path.endswith(".parquet"):
+        if pq is None:
+            raise ImportError("Writing Parquet traces requires pyarrow")
+        return ParquetTraceWriter(path, resume_at)
+    raise ValueError(f"Unknown trace format for {path!r}, expected .csv, .npy or .parquet")
@@ -0,0 +1,136 @@
+"""Discrete-event engine for the headless bus simulation.
+
+Instead of advancing by 1/FPS and touching every passenger each tick, the
+engine keeps a heap of events (passenger arrival, bus arriving at a stop
+and end of the dwell) and jumps straight from one to the next.
+Passengers get off when their bus arrives at their destination, so rides
+need no events of their own. Events fall on the same tick grid as the
+fixed-step loop and are handled by the same Simulation methods in the
+same order, so both engines give every passenger the same times.
+"""
+import heapq
+
+from simulation import Simulation, TIME_STEP, run_from_command_line, tick_at
+
+# Event kinds
+ARRIVAL = "arrival"  # A passenger turns up at a stop
+BUS_ARRIVAL = "bus_arrival"  # The bus reaches the stop it is heading for
+DWELL_END = "dwell_end"  # The bus leaves the stop it is loading at
+
+
+class EventSimulation(Simulation):
+    """Discrete-event simulation that jumps from event to event instead of ticking at FPS"""
+
+    def reset(self):
+        super().reset()
+        self.events = []  # Heap of (tick, rank, kind, bus) tuples
+
+        # The buses start off the road heading for their first stop
+        for bus in self.buses:
+            bus.synced_at = 0  # Time the bus's position and busy time were last brought up to date
+            self.schedule(bus.ticks_left, BUS_ARRIVAL, bus)
+        self.schedule_next_arrival()
+
+    def get_state(self):
+        # Bring the buses up to the clock and put their pending events as ticks left, as the fixed-step loop keeps them
+        for tick, _, kind, bus in self.events:
+            if bus is not None:
+                self.sync_bus(bus)
+                bus.ticks_left = tick - self.tick
+        return super().get_state()
+
+    def set_state(self, state):
+        super().set_state(state)
+        self.events = []
+        for bus in self.buses:
+            bus.synced_at = self.time
+            self.schedule(self.tick + bus.ticks_left, BUS_ARRIVAL if bus.state == "moving" else DWELL_END, bus)
+        self.schedule_next_arrival()
+
+    def schedule(self, tick, kind, bus=None):
+        """Queue an event to fire on `tick`
+
+        Events on the same tick fire in the order the fixed-step loop
+        handles them: the passenger arrival first, then the buses in fleet
+        order. Each bus and the arrival schedule have one event pending at
+        a time, so (tick, rank) never ties.
+        """
+        rank = -1 if bus is None else bus.id
+        heapq.heappush(self.events, (tick, rank, kind, bus))
+
+    def schedule_next_arrival(self):
+        """Queue the next arrival of the pre-drawn schedule on the tick that reaches it"""
+        if self.arrival_times:
+            self.schedule(tick_at(self.arrival_times[0]), ARRIVAL)
+
+    def sync_bus(self, bus):
+        """Bring a bus up to the clock, carrying it along the road while it drives"""
+        if bus.state == "moving":
+            bus.drive(self.time - bus.synced_at)
+        bus.synced_at = self.time
+
+    def on_arrival(self):
+        self.arrival_times.popleft()
+        if self.auto_generate:
+            self.add_passenger(self.generate_random_passenger())
+        self.schedule_next_arrival()
+
+    def on_bus_arrival(self, bus):
+        self.sync_bus(bus)
+        self.bus_arrived(bus)
+        self.schedule(self.tick + bus.ticks_left, DWELL_END, bus)
+
+    def on_dwell_end(self, bus):
+        self.sync_bus(bus)
+        self.bus_leaving(bus)
+        self.schedule(self.tick + bus.ticks_left, BUS_ARRIVAL, bus)
+
+    def run_until(self, end_time):
+        """Process every event up to the tick reaching `end_time` and leave the clock there"""
+        end_tick = tick_at(end_time)
+        while self.events and self.events[0][0] <= end_tick:
+            tick, _, kind, bus = heapq.heappop(self.events)
+            self.tick = tick
+            self.time = tick * TIME_STEP
+
+            if kind == ARRIVAL:
+                self.on_arrival()
+            elif kind == BUS_ARRIVAL:
+                self.on_bus_arrival(bus)
+            elif kind == DWELL_END:
+                self.on_dwell_end(bus)
+
+            # Checkpoint between ticks only, as the fixed-step loop does
+            if not self.events or self.events[0][0] > tick:
+                self.checkpoint_if_due()
+
+        self.tick = max(self.tick, end_tick)
+        self.time = self.tick * TIME_STEP
+        for bus in self.buses:
+            self.sync_bus(bus)
+
+    def step(self):
+        """Advance the clock by one tick, returning False once the time limit is hit"""
+        if self.tick >= tick_at(self.config.max_simulation_time):
+            self.simulation_ended = True
+            return False
+        self.run_until((self.tick + 1) * TIME_STEP)
+        return True
+
+    def run_headless(self, duration=None):
+        """Jump through every event until `duration` simulated seconds pass or the time limit"""
+        if duration is None:
+            duration = self.config.max_simulation_time
+        self.run_until(min(duration, self.config.max_simulation_time))
+        self.simulation_ended = True
+        return self.summary()
+
+
+def main():
+    # Run one scenario event by event and print the statistics
+    run_from_command_line(EventSimulation)
+
+
+# Only run the main function if this script is executed directly
+if __name__ == "__main__":
+    main()
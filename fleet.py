@@ -0,0 +1,155 @@
+"""Shared stop queues, boarding policies and the dispatch index for a fleet of buses.
+
+Several buses on different routes can call at the same stop. Each stop
+keeps its waiting passengers split by destination, each destination in a
+heap ordered by the stop's BoardingPolicy, so a bus boards the passenger
+the policy puts first among those it can actually carry, without sorting
+or scanning the rest of the line. The ApproachIndex records, for every
+stop, which buses are heading there (ordered by arrival time) and which
+are loading there, so neither needs a buses x stops scan.
+"""
+import heapq
+from bisect import bisect_left, insort
+
+
+class BoardingPolicy:
+    """Order in which a loading bus takes waiting passengers: smallest (line_key, key) first
+
+    key() ranks a passenger among those heading to the same destination
+    and is fixed when they join the queue. line_key() ranks whole
+    destination lines for the bus that is loading. Ties go to the earlier
+    arrival. The base class is first come, first served.
+    """
+    name = "fcfs"
+    label = "FCFS"
+
+    def key(self, passenger):
+        return passenger.arrival_time
+
+    def line_key(self, bus, destination):
+        return 0
+
+
+class ShortestRideFirst(BoardingPolicy):
+    """Passengers with the shortest planned ride board first"""
+    name = "shortest_ride"
+    label = "Shortest Ride First"
+
+    def key(self, passenger):
+        return passenger.planned_ride_time
+
+
+class PriorityClasses(BoardingPolicy):
+    """Lower priority classes board first, first come first served within a class"""
+    name = "priority"
+    label = "Priority Classes"
+
+    def key(self, passenger):
+        return passenger.priority, passenger.arrival_time
+
+
+class DestinationAware(BoardingPolicy):
+    """Passengers getting off soonest on the bus's loop board first, first come first served per destination"""
+    name = "destination"
+    label = "Destination Aware"
+
+    def line_key(self, bus, destination):
+        # Stops the bus still has to make before reaching the destination
+        return (bus.route_positions[destination] - bus.route_position) % len(bus.route)
+
+
+# Boarding policies by name, as used by SimulationConfig.boarding_policy
+POLICIES = {policy.name: policy for policy in (BoardingPolicy, ShortestRideFirst, PriorityClasses, DestinationAware)}
+
+
+class StopQueue:
+    """Waiting passengers at one stop, boarded in the order of a BoardingPolicy"""
+
+    def __init__(self, policy=None):
+        self.policy = policy if policy is not None else BoardingPolicy()
+        self.lines = {}  # Destination stop -> heap of (policy key, arrival time, index, passenger)
+        self.waiting = {}  # Passenger index -> passenger, in arrival order
+        self.boarded = 0  # Passengers taken off this line so far, lets views spot a changed line
+
+    def __len__(self):
+        return len(self.waiting)
+
+    def __iter__(self):
+        # Arrival order, however the policy boards them
+        return iter(self.waiting.values())
+
+    def entry(self, passenger):
+        return self.policy.key(passenger), passenger.arrival_time, passenger.index, passenger
+
+    def append(self, passenger):
+        heapq.heappush(self.lines.setdefault(passenger.destination_stop, []), self.entry(passenger))
+        self.waiting[passenger.index] = passenger
+
+    def set_policy(self, policy):
+        """Re-order the passengers already waiting under another boarding policy"""
+        self.policy = policy
+        self.lines = {}
+        for passenger in self.waiting.values():
+            self.lines.setdefault(passenger.destination_stop, []).append(self.entry(passenger))
+        for line in self.lines.values():
+            heapq.heapify(line)
+
+    def pop_for(self, bus):
+        """Remove and return the passenger the policy puts first among those `bus` can carry
+
+        Returns None when nobody in line can use a bus serving its route.
+        """
+        best_line = None
+        best_rank = None
+        for destination, line in self.lines.items():
+            if line and destination in bus.route_stops:
+                # Entries hold a unique passenger index, so comparing them never reaches the passenger
+                rank = (self.policy.line_key(bus, destination), line[0])
+                if best_rank is None or rank < best_rank:
+                    best_line = line
+                    best_rank = rank
+
+        if best_line is None:
+            return None
+        self.boarded += 1
+        passenger = heapq.heappop(best_line)[-1]
+        del self.waiting[passenger.index]
+        return passenger
+
+
+class ApproachIndex:
+    """Per-stop index of the buses heading to and loading at each stop"""
+
+    def __init__(self, stop_count):
+        self.approaching = [[] for _ in range(stop_count)]  # Sorted (eta, bus id) per stop
+        self.loading = [[] for _ in range(stop_count)]  # Buses loading per stop, in arrival order
+        self.entries = {}  # Bus id -> (stop, eta) while the bus is approaching
+
+    def approach(self, bus, stop, eta):
+        """Record that `bus` is heading to `stop` and expected there at `eta`"""
+        insort(self.approaching[stop], (eta, bus.id))
+        self.entries[bus.id] = (stop, eta)
+
+    def arrive(self, bus, stop):
+        """Move `bus` from the approaching list of `stop` to its loading list"""
+        if bus.id in self.entries:
+            stop_approaching, eta = self.entries.pop(bus.id)
+            approaching = self.approaching[stop_approaching]
+            del approaching[bisect_left(approaching, (eta, bus.id))]
+        self.loading[stop].append(bus)
+
+    def retime(self, bus, eta):
+        """Move the expected arrival of approaching `bus` to `eta`"""
+        stop, old_eta = self.entries[bus.id]
+        approaching = self.approaching[stop]
+        del approaching[bisect_left(approaching, (old_eta, bus.id))]
+        self.approach(bus, stop, eta)
+
+    def leave(self, bus, stop):
+        """Drop `bus` from the loading list of `stop`"""
+        self.loading[stop].remove(bus)
+
+    def next_arrival(self, stop):
+        """(eta, bus id) of the first bus heading to `stop`, or None"""
+        approaching = self.approaching[stop]
+        return approaching[0] if approaching else None
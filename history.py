@@ -0,0 +1,79 @@
+"""Record of the passengers who completed their ride.
+
+A long run completes far more passengers than anyone scrolls back
+through, so CompletionLog keeps only the most recent ones in a ring
+buffer for display, counts the rest, and can stream every completion to
+a CSV file as it happens for the full history. A run resumed from a
+checkpoint carries on the file it was writing instead of starting over.
+"""
+import csv
+from collections import deque
+
+# Completed passengers kept in memory for the stats table
+RECENT_COMPLETIONS = 1000
+
+# Columns of the on-disk history
+HISTORY_FIELDS = ["id", "stop_index", "destination_stop", "arrival_time", "planned_ride_time", "ride_time",
+                  "start_time", "completion_time", "wait_time", "turnaround_time"]
+
+
+def reopen_csv(path, rows):
+    """Open the CSV file at `path` for appending after its header and first `rows` rows, dropping the rest"""
+    with open(path, "r+b") as file:
+        for _ in range(rows + 1):
+            if not file.readline():
+                raise ValueError(f"{path} holds fewer than the {rows} rows it had when the state was saved")
+        file.truncate(file.tell())
+    return open(path, "a", newline="")
+
+
+class CompletionLog:
+    """Ring buffer of recently completed passengers, with the full history optionally spilled to CSV
+
+    With `resume_at`, an existing history at `path` is kept up to that many
+    rows and appended to, rather than overwritten.
+    """
+
+    def __init__(self, capacity=RECENT_COMPLETIONS, path=None, resume_at=None):
+        self.recent = deque(maxlen=capacity)  # Newest last
+        self.total = 0  # Completions ever logged, including those dropped from the ring
+        self.written = 0  # Rows in the on-disk history
+        self.file = None
+        self.writer = None
+        if path is not None and resume_at is not None:
+            self.file = reopen_csv(path, resume_at)
+            self.writer = csv.writer(self.file)
+            self.written = resume_at
+        elif path is not None:
+            self.file = open(path, "w", newline="")
+            self.writer = csv.writer(self.file)
+            self.writer.writerow(HISTORY_FIELDS)
+
+    def __len__(self):
+        return self.total
+
+    def __iter__(self):
+        return iter(self.recent)
+
+    def append(self, passenger):
+        self.recent.append(passenger)
+        self.total += 1
+        if self.writer is not None:
+            self.writer.writerow([getattr(passenger, field) for field in HISTORY_FIELDS])
+            self.written += 1
+
+    def latest(self, count, skip=0):
+        """Up to `count` completions in order, ending `skip` places before the newest one"""
+        end = len(self.recent) - skip
+        start = max(0, end - count)
+        return [self.recent[i] for i in range(start, end)]
+
+    def flush(self):
+        if self.file is not None:
+            self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+            self.writer = None
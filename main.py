@@ -1,7 +1,21 @@
 import pygame
-import random
+import argparse
+import heapq
 import math
-from collections import deque
+import os
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+
+import simulation
+from event_trace import read_trace_config
+from fleet import POLICIES, StopQueue, ApproachIndex
+from simulation import FPS, TIME_STEP, MAX_SIMULATION_TIME, PASSENGER_GENERATION_CUTOFF, PASSENGER_COLORS
+from stats import PassengerStats
+
+try:
+    from replay import TraceReplay
+except ImportError:  # Replaying a trace needs NumPy
+    TraceReplay = None
 
 # Initialize pygame
 pygame.init()
@@ -48,120 +62,109 @@ except:
     title_font = pygame.font.Font(None, 28)
     header_font = pygame.font.Font(None, 24)
 
-# Simulation parameters
-FPS = 60
-PASSENGER_GENERATION_RATE = 0.01  # Reduced from 0.03 to slow down passenger generation
-MAX_PASSENGERS = 100  # Increased maximum passengers waiting (was 20)
-MIN_RIDE_TIME = 5  # Minimum ride time (in seconds)
-MAX_RIDE_TIME = 15  # Maximum ride time (in seconds)
+# Viewer parameters
 SIMULATION_SPEED = 1  # Frames per simulation tick (higher = faster)
-BUS_CAPACITY = 10  # Maximum passengers on the bus
-BUS_SPEED = 100  # Pixels per second
-BUS_STOP_TIME = 2  # Seconds to stop at each bus stop
-MAX_SIMULATION_TIME = 30  # Maximum simulation time in seconds (changed from 60 to 30)
-PASSENGER_GENERATION_CUTOFF = 25  # Stop generating passengers after this time
-
-# Bus stop positions (x coordinates)
-BUS_STOPS = [150, 350, 550, 750, 950]
+TEXT_CACHE_SIZE = 2048  # Rendered text surfaces kept for reuse
+SPRITE_CACHE_SIZE = 1024  # Passenger sprites kept for reuse
+ROW_CACHE_SIZE = 256  # Rendered stats table rows kept for reuse
+INFO_PANEL_HEIGHT = 60  # Height of the time and controls panel at the bottom
+CHECKPOINT_FILE = "bus_simulation.ckpt"  # Where F5 saves and F9 restores unless --checkpoint says otherwise
+
 BUS_STOP_Y = HEIGHT - 250  # Y coordinate for all bus stops
 
-# Passenger colors
-PASSENGER_COLORS = [
-    (220, 80, 80),  # Red
-    (80, 180, 80),  # Green
-    (80, 120, 220),  # Blue
-    (240, 200, 0),  # Yellow
-    (240, 140, 0),  # Orange
-    (160, 80, 220),  # Purple
-    (0, 180, 200),  # Cyan
-    (180, 100, 140)  # Magenta
-]
-
-
-class Passenger:
-    def __init__(self, passenger_id, arrival_time, ride_time, stop_index):
-        self.id = passenger_id
-        self.arrival_time = arrival_time  # When the passenger arrives
-        self.ride_time = ride_time  # Total time needed on the bus
-        self.remaining_time = ride_time  # Remaining time to complete journey
-        self.start_time = -1  # When the passenger boards the bus
-        self.completion_time = -1  # When the passenger completes journey
-        self.wait_time = 0  # Time spent waiting at the bus stop
-        self.turnaround_time = 0  # Total time from arrival to completion
-        self.service_time = 0  # Time spent on the bus
-        self.state = "waiting"  # waiting, onboard, completed
-        self.color = random.choice(PASSENGER_COLORS)  # Random color for the passenger
-        self.progress = 0  # Visual progress indicator (0-100%)
-        self.stop_index = stop_index  # Which bus stop they're at
-        # Assign a random destination stop that's different from the starting stop
-        possible_destinations = list(range(len(BUS_STOPS)))
-        possible_destinations.remove(stop_index)  # Remove current stop from possibilities
-        self.destination_stop = random.choice(possible_destinations)
+# Rendered text surfaces keyed by (string, font, color), least recently used first
+text_cache = OrderedDict()
+
+# Passenger sprites keyed by (color, id, destination, radius), least recently used first
+sprite_cache = OrderedDict()
+
+
+def cached_surface(cache, key, limit, render):
+    """Look `key` up in an LRU cache of surfaces, calling render() to fill it on a miss"""
+    surface = cache.get(key)
+    if surface is None:
+        surface = render()
+        cache[key] = surface
+        if len(cache) > limit:
+            cache.popitem(last=False)
+    else:
+        cache.move_to_end(key)
+    return surface
+
+
+def render_text(text_font, text, color):
+    """Antialiased text surface, rendered once and reused while it stays in the cache"""
+    return cached_surface(text_cache, (text, text_font, color), TEXT_CACHE_SIZE,
+                          lambda: text_font.render(text, True, color))
+
+
+def render_passenger(color, passenger_id, destination_stop, radius, border, label_offset):
+    """Passenger glyph (circle, ID and destination label) on a transparent surface
+
+    Returns the surface and the pixel of it that sits on the passenger's position.
+    """
+    id_text = render_text(small_font, f"{passenger_id}", BLACK)
+    dest_text = render_text(small_font, f"→{destination_stop + 1}", BLACK)
+
+    width = max(2 * radius + 1, id_text.get_width(), dest_text.get_width()) + 2
+    center_x = width // 2
+    center_y = max(radius, label_offset) + 1
+    height = center_y + max(radius, id_text.get_height() // 2) + 2
+
+    sprite = pygame.Surface((width, height), pygame.SRCALPHA)
+    pygame.draw.circle(sprite, color, (center_x, center_y), radius)
+    pygame.draw.circle(sprite, BLACK, (center_x, center_y), radius, border)
+    sprite.blit(id_text, (center_x - id_text.get_width() // 2, center_y - id_text.get_height() // 2))
+    sprite.blit(dest_text, (center_x - dest_text.get_width() // 2, center_y - label_offset))
+    return sprite, (center_x, center_y)
+
+
+def passenger_sprite(passenger, radius, border, label_offset):
+    """Cached glyph of a passenger at the given circle size"""
+    key = (passenger.color, passenger.id, passenger.destination_stop, radius)
+    return cached_surface(sprite_cache, key, SPRITE_CACHE_SIZE,
+                          lambda: render_passenger(passenger.color, passenger.id, passenger.destination_stop,
+                                                   radius, border, label_offset))
+
+
+class Passenger(simulation.Passenger):
+    def __init__(self, store, index):
+        super().__init__(store, index)
 
         # Visual representation
         self.size = 20
-        self.x = BUS_STOPS[stop_index]
+        self.x = 0  # Put at the passenger's stop by whatever lines them up there
         self.y = BUS_STOP_Y - 30 - (self.size * 1.5)
         self.target_x = self.x
         self.target_y = self.y
         self.moving = False
         self.boarding_progress = 0  # For boarding animation
+        self.queue_slot = None  # Position in the line at the stop, assigned on arrival
 
-    def update(self, current_time, delta_time):
-        if self.state == "waiting":
-            # Update wait time while waiting
-            self.wait_time = current_time - self.arrival_time
-
-            # Move towards target position (for queueing animation)
-            if self.moving:
-                dx = self.target_x - self.x
-                dy = self.target_y - self.y
-                distance = math.sqrt(dx * dx + dy * dy)
-
-                if distance > 1:
-                    self.x += dx * 0.1
-                    self.y += dy * 0.1
-                else:
-                    self.moving = False
-                    self.x = self.target_x
-                    self.y = self.target_y
+    def animate(self):
+        # Move towards target position (for queueing animation)
+        if self.moving:
+            dx = self.target_x - self.x
+            dy = self.target_y - self.y
+            distance = math.sqrt(dx * dx + dy * dy)
 
-        elif self.state == "onboard":
-            # Update service time while on bus
-            if self.start_time == -1:
-                self.start_time = current_time
-            self.service_time = current_time - self.start_time
-
-            # Update remaining time
-            self.remaining_time -= delta_time
-            if self.remaining_time <= 0:
-                self.remaining_time = 0
-                self.state = "completed"
-                self.completion_time = current_time
-                self.turnaround_time = self.completion_time - self.arrival_time
-
-            # Update progress percentage
-            self.progress = 100 * (1 - self.remaining_time / self.ride_time)
+            if distance > 1:
+                self.x += dx * 0.1
+                self.y += dy * 0.1
+            else:
+                self.moving = False
+                self.x = self.target_x
+                self.y = self.target_y
 
-        elif self.state == "completed":
-            # Ensure statistics are properly calculated
-            if self.completion_time == -1:
-                self.completion_time = current_time
-            self.turnaround_time = self.completion_time - self.arrival_time
+    def sprite(self):
+        """(surface, position) pair to blit for a waiting passenger"""
+        surface, (anchor_x, anchor_y) = passenger_sprite(self, self.size, 2, self.size + 15)
+        return surface, (int(self.x) - anchor_x, int(self.y) - anchor_y)
 
     def draw(self, screen):
         if self.state == "waiting":
-            # Draw waiting passenger
-            pygame.draw.circle(screen, self.color, (int(self.x), int(self.y)), self.size)
-            pygame.draw.circle(screen, BLACK, (int(self.x), int(self.y)), self.size, 2)
-
-            # Draw passenger ID
-            id_text = small_font.render(f"{self.id}", True, BLACK)
-            screen.blit(id_text, (self.x - id_text.get_width() // 2, self.y - id_text.get_height() // 2))
-
-            # Draw destination indicator (small arrow pointing to destination)
-            dest_text = small_font.render(f"→{self.destination_stop + 1}", True, BLACK)
-            screen.blit(dest_text, (self.x - dest_text.get_width() // 2, self.y - self.size - 15))
+            # Draw waiting passenger with their ID and destination
+            screen.blit(*self.sprite())
 
         elif self.state == "onboard":
             # Passengers on the bus are drawn by the Bus class
@@ -172,24 +175,18 @@ class Passenger:
             pass
 
 
-class Bus:
-    def __init__(self):
-        self.x = 0
+class Bus(simulation.Bus):
+    body_sprite = None  # Shared pre-rendered body, wheels and windows
+
+    def __init__(self, config=None, bus_id=0, route=None, route_position=0):
+        super().__init__(config, bus_id, route, route_position)
         self.y = BUS_STOP_Y - 50
         self.width = 120
         self.height = 60
-        self.passengers = []
-        self.current_stop = 0
-        self.target_x = BUS_STOPS[0]
-        self.state = "moving"  # moving, loading, unloading
-        self.stop_timer = 0
-        self.idle_time = 0
-        self.busy_time = 0
-        self.total_passengers_served = 0
 
         # For drawing passengers on the bus
         self.passenger_positions = []
-        for i in range(BUS_CAPACITY):
+        for i in range(self.config.bus_capacity):
             row = i // 5
             col = i % 5
             self.passenger_positions.append((
@@ -197,121 +194,81 @@ class Bus:
                 15 + row * 20
             ))
 
-    def update(self, delta_time, waiting_passengers):
-        # Update bus state
-        if self.state == "moving":
-            # Move towards the current target
-            dx = self.target_x - self.x
-            distance = abs(dx)
+        # Every bus looks the same, so the body is rendered once for the whole fleet
+        if Bus.body_sprite is None:
+            Bus.body_sprite = self.render_body()
 
-            if distance > 5:
-                # Move towards target
-                direction = 1 if dx > 0 else -1
-                self.x += direction * BUS_SPEED * delta_time
-                self.busy_time += delta_time
-            else:
-                # Arrived at bus stop
-                self.x = self.target_x
-                self.state = "loading"
-                self.stop_timer = BUS_STOP_TIME
-
-        elif self.state == "loading":
-            # At a bus stop, loading/unloading passengers
-            self.stop_timer -= delta_time
-
-            # Unload passengers who reached their destination
-            for passenger in self.passengers[:]:
-                if passenger.destination_stop == self.current_stop:
-                    passenger.state = "completed"
-                    self.passengers.remove(passenger)
-                    self.total_passengers_served += 1
-
-            # Load new passengers if there's room
-            if len(self.passengers) < BUS_CAPACITY:
-                # Find passengers waiting at this stop
-                stop_passengers = [p for p in waiting_passengers if p.stop_index == self.current_stop
-                                   and p.state == "waiting"]
-
-                # Sort by arrival time (FCFS)
-                stop_passengers.sort(key=lambda p: p.arrival_time)
-
-                # Load as many as possible
-                for passenger in stop_passengers:
-                    if len(self.passengers) < BUS_CAPACITY:
-                        passenger.state = "onboard"
-                        passenger.start_time = -1  # Will be set in passenger.update()
-                        self.passengers.append(passenger)
-                    else:
-                        break
-
-            # Move to next stop when timer expires
-            if self.stop_timer <= 0:
-                self.current_stop = (self.current_stop + 1) % len(BUS_STOPS)
-                self.target_x = BUS_STOPS[self.current_stop]
-                self.state = "moving"
-
-        # Update passenger positions on the bus
+    def unload(self):
+        alighted = super().unload()
+        self.seat_passengers()
+        return alighted
+
+    def board_from(self, queue):
+        boarded = super().board_from(queue)
+        self.seat_passengers()
+        return boarded
+
+    def seat_passengers(self):
+        """Update passenger positions on the bus"""
         for i, passenger in enumerate(self.passengers):
             if i < len(self.passenger_positions):
                 passenger.bus_x, passenger.bus_y = self.passenger_positions[i]
 
-    def draw(self, screen):
+    def render_body(self):
+        """Bus body, wheels and windows on a transparent surface, drawn once per bus"""
+        wheel_radius = 10
+        sprite = pygame.Surface((self.width, self.height + wheel_radius), pygame.SRCALPHA)
+
         # Draw bus body
-        pygame.draw.rect(screen, BUS_YELLOW, (self.x - self.width // 2, self.y, self.width, self.height),
-                         border_radius=10)
-        pygame.draw.rect(screen, BLACK, (self.x - self.width // 2, self.y, self.width, self.height), 2,
-                         border_radius=10)
+        pygame.draw.rect(sprite, BUS_YELLOW, (0, 0, self.width, self.height), border_radius=10)
+        pygame.draw.rect(sprite, BLACK, (0, 0, self.width, self.height), 2, border_radius=10)
 
         # Draw wheels
-        wheel_radius = 10
-        pygame.draw.circle(screen, BLACK, (int(self.x - self.width // 3), int(self.y + self.height)), wheel_radius)
-        pygame.draw.circle(screen, BLACK, (int(self.x + self.width // 3), int(self.y + self.height)), wheel_radius)
+        pygame.draw.circle(sprite, BLACK, (self.width // 2 - self.width // 3, self.height), wheel_radius)
+        pygame.draw.circle(sprite, BLACK, (self.width // 2 + self.width // 3, self.height), wheel_radius)
 
         # Draw windows
         window_width = 15
         window_height = 20
-        window_y = self.y + 10
         for i in range(4):
-            window_x = self.x - self.width // 2 + 20 + i * 25
-            pygame.draw.rect(screen, LIGHT_BLUE, (window_x, window_y, window_width, window_height))
-            pygame.draw.rect(screen, BLACK, (window_x, window_y, window_width, window_height), 1)
+            window_x = 20 + i * 25
+            pygame.draw.rect(sprite, LIGHT_BLUE, (window_x, 10, window_width, window_height))
+            pygame.draw.rect(sprite, BLACK, (window_x, 10, window_width, window_height), 1)
+        return sprite
+
+    def draw(self, screen):
+        left = int(self.x) - self.width // 2
+        top = int(self.y)
 
-        # Draw passengers on the bus
+        # Draw the bus body and the passengers on board in one batch
+        blits = [(self.body_sprite, (left, top))]
         for i, passenger in enumerate(self.passengers):
             if i < len(self.passenger_positions):
                 px, py = self.passenger_positions[i]
-                # Convert to screen coordinates
-                px += self.x - self.width // 2
-                py += self.y
-
-                # Draw passenger
-                pygame.draw.circle(screen, passenger.color, (int(px), int(py)), 8)
-                pygame.draw.circle(screen, BLACK, (int(px), int(py)), 8, 1)
-
-                # Draw passenger ID
-                id_text = small_font.render(f"{passenger.id}", True, BLACK)
-                screen.blit(id_text, (px - id_text.get_width() // 2, py - id_text.get_height() // 2))
-
-                # Draw small destination indicator
-                dest_text = small_font.render(f"→{passenger.destination_stop + 1}", True, BLACK)
-                screen.blit(dest_text, (px - dest_text.get_width() // 2, py - 12))
+                sprite, (anchor_x, anchor_y) = passenger_sprite(passenger, 8, 1, 12)
+                blits.append((sprite, (left + px - anchor_x, top + py - anchor_y)))
+        screen.blits(blits, doreturn=False)
 
         # Draw bus ID and status
-        bus_text = font.render("BUS", True, BLACK)
+        bus_text = render_text(font, f"BUS {self.id + 1}", BLACK)
         screen.blit(bus_text, (self.x - bus_text.get_width() // 2, self.y - 25))
 
         # Draw passenger count
-        count_text = small_font.render(f"{len(self.passengers)}/{BUS_CAPACITY}", True, BLACK)
+        count_text = render_text(small_font, f"{len(self.passengers)}/{self.config.bus_capacity}", BLACK)
         screen.blit(count_text, (self.x - count_text.get_width() // 2, self.y + self.height + 15))
 
         # Draw state indicator
-        state_text = small_font.render(self.state.upper(), True, BLACK)
+        state_text = render_text(small_font, self.state.upper(), BLACK)
         screen.blit(state_text, (self.x - state_text.get_width() // 2, self.y - 40))
 
         # Draw current stop indicator
-        stop_text = small_font.render(f"Stop: {self.current_stop + 1}", True, BLACK)
+        stop_text = render_text(small_font, f"Stop: {self.current_stop + 1}", BLACK)
         screen.blit(stop_text, (self.x - stop_text.get_width() // 2, self.y - 55))
 
+    def bounds(self):
+        """Screen area covered by draw(), from the labels above the bus to the count below the wheels"""
+        return pygame.Rect(self.x - self.width // 2 - 2, self.y - 57, self.width + 4, self.height + 95)
+
 
 class BusStopSign:
     def __init__(self, x, y, stop_number):
@@ -332,11 +289,11 @@ class BusStopSign:
         pygame.draw.rect(screen, BLACK, (self.x - sign_width // 2, self.y - sign_height, sign_width, sign_height), 2)
 
         # Draw bus symbol
-        bus_text = small_font.render("BUS", True, WHITE)
+        bus_text = render_text(small_font, "BUS", WHITE)
         screen.blit(bus_text, (self.x - bus_text.get_width() // 2, self.y - sign_height + 5))
 
         # Draw stop number
-        num_text = small_font.render(f"{self.stop_number}", True, WHITE)
+        num_text = render_text(small_font, f"{self.stop_number}", WHITE)
         screen.blit(num_text, (self.x - num_text.get_width() // 2, self.y - sign_height // 2 + 5))
 
 
@@ -346,39 +303,71 @@ class GanttChart:
         self.y = y
         self.width = width
         self.height = height
-        self.timeline = []  # List of (passenger, start_time, end_time) tuples
+        self.riding = {}  # Passenger ID -> [passenger, start_time, None] ride segment of those on board at the last update
         self.display_time = MAX_SIMULATION_TIME  # Show the full simulation timeline
+        self.cutoff_time = PASSENGER_GENERATION_CUTOFF  # When passenger generation stops
         self.scroll_position = 0  # Current scroll position in seconds
         self.row_height = 25  # Height of each passenger row
         self.max_rows = 10  # Maximum number of rows to display
-        self.passenger_rows = {}  # Maps passenger ID to row number
+        self.passenger_rows = {}  # Passenger ID -> row number, for the passengers riding
+        self.row_opened = []  # Time each row was first used, in row order (so sorted)
+        self.row_segments = []  # Ride segments of each row in time order (rides in a row never overlap)
+        self.row_starts = []  # Start times of each row's segments, for bisecting the visible window
+        self.row_ends = []  # End times of each row's segments, inf while the ride is open
+        self.free_rows = []  # Heap of rows released by finished rides, lowest reused first
         self.vertical_scroll = 0  # Vertical scroll position
+        self.last_update = 0  # Time the chart shows: the last update, or the seek point of a replay
+
+    def allocate_row(self, passenger, start_time):
+        """Give a passenger boarding at `start_time` the lowest free row"""
+        if self.free_rows:
+            row = heapq.heappop(self.free_rows)
+        else:
+            row = len(self.row_opened)
+            self.row_opened.append(start_time)
+            self.row_segments.append([])
+            self.row_starts.append([])
+            self.row_ends.append([])
+        self.passenger_rows[passenger.id] = row
+        return row
+
+    def visible_segments(self, row, start_time, end_time):
+        """Segments of `row` overlapping [start_time, end_time], found by bisecting its sorted starts and ends"""
+        first = bisect_left(self.row_ends[row], start_time)
+        last = bisect_right(self.row_starts[row], end_time)
+        return self.row_segments[row][first:last]
+
+    def open_ride(self, passenger, start_time):
+        """Start a ride segment for a passenger who just boarded"""
+        segment = [passenger, start_time, None]
+        self.riding[passenger.id] = segment
+        row = self.allocate_row(passenger, start_time)
+        self.row_segments[row].append(segment)
+        self.row_starts[row].append(start_time)
+        self.row_ends[row].append(math.inf)
+
+    def close_ride(self, passenger_id, end_time):
+        """End a passenger's ride segment and free its row"""
+        segment = self.riding.pop(passenger_id)
+        segment[2] = end_time
+        row = self.passenger_rows.pop(passenger_id)
+        self.row_ends[row][-1] = end_time  # The open ride is always the row's last
+        heapq.heappush(self.free_rows, row)
 
     def update(self, current_passengers, current_time):
-        # Update the timeline with the current passengers
-        for passenger in current_passengers:
-            # Check if we need to create a new timeline entry
-            if not any(entry[0] == passenger for entry in self.timeline):
-                # Create a new entry for this passenger
-                self.timeline.append([passenger, current_time, current_time])
-
-                # Assign a row if not already assigned
-                if passenger.id not in self.passenger_rows:
-                    # Find the first available row
-                    used_rows = set(self.passenger_rows.values())
-                    for row in range(50):  # Allow up to 50 rows total
-                        if row not in used_rows:
-                            self.passenger_rows[passenger.id] = row
-                            break
-                    else:
-                        # If all rows are used, assign to the last row
-                        self.passenger_rows[passenger.id] = 0
-            else:
-                # Update the end time of the current passenger
-                for entry in self.timeline:
-                    if entry[0] == passenger:
-                        entry[2] = current_time
-                        break
+        # Only boardings and alightings touch the chart, riders still on board extend implicitly
+        on_board = {passenger.id: passenger for passenger in current_passengers}
+
+        for passenger_id in list(self.riding):
+            if passenger_id not in on_board:
+                # Close the ride at the last time the passenger was seen
+                self.close_ride(passenger_id, self.last_update)
+
+        for passenger_id, passenger in on_board.items():
+            if passenger_id not in self.riding:
+                self.open_ride(passenger, current_time)
+
+        self.last_update = current_time
 
     def draw(self, screen, current_time):
         # Draw panel background
@@ -386,7 +375,7 @@ class GanttChart:
         pygame.draw.rect(screen, PANEL_BORDER, (self.x, self.y, self.width, self.height), 2, border_radius=10)
 
         # Draw title
-        title_text = title_font.render("Gantt Chart", True, BLACK)
+        title_text = render_text(title_font, "Gantt Chart", BLACK)
         screen.blit(title_text, (self.x + (self.width - title_text.get_width()) // 2, self.y + 10))
 
         # Draw horizontal separator
@@ -417,37 +406,26 @@ class GanttChart:
 
             # Draw time label
             if i % 5 == 0 or i == self.display_time:  # Only show every 5 seconds for cleaner look
-                time_label = small_font.render(f"{i + self.scroll_position:.0f}s", True, BLACK)
+                time_label = render_text(small_font, f"{i + self.scroll_position:.0f}s", BLACK)
                 screen.blit(time_label, (pos_x - time_label.get_width() // 2, chart_y + chart_height + 5))
 
         # Draw passenger generation cutoff line
-        if PASSENGER_GENERATION_CUTOFF >= self.scroll_position and PASSENGER_GENERATION_CUTOFF <= self.scroll_position + self.display_time:
-            cutoff_x = chart_x + ((PASSENGER_GENERATION_CUTOFF - self.scroll_position) / self.display_time) * chart_width
+        if self.cutoff_time >= self.scroll_position and self.cutoff_time <= self.scroll_position + self.display_time:
+            cutoff_x = chart_x + ((self.cutoff_time - self.scroll_position) / self.display_time) * chart_width
             pygame.draw.line(screen, ORANGE, (cutoff_x, chart_y), (cutoff_x, chart_y + chart_height), 2)
-            cutoff_label = small_font.render("No new passengers", True, ORANGE)
+            cutoff_label = render_text(small_font, "No new passengers", ORANGE)
             screen.blit(cutoff_label, (cutoff_x - cutoff_label.get_width() // 2, chart_y - 15))
 
-        # Get all active passengers (those with timeline entries)
-        active_passengers = []
-        for entry in self.timeline:
-            if entry[0].id not in [p.id for p in active_passengers]:
-                active_passengers.append(entry[0])
-
-        # Sort passengers by ID for consistent display
-        active_passengers.sort(key=lambda p: p.id)
-
-        # Calculate total rows and adjust vertical scroll if needed
-        total_rows = len(active_passengers)
+        # Rows are shared by rides that don't overlap, so the chart only grows with the peak load.
+        # Everything is drawn as of last_update, so a chart built ahead (a replay) hides later rides.
+        total_rows = bisect_right(self.row_opened, self.last_update)
         max_scroll = max(0, total_rows - visible_rows)
         self.vertical_scroll = min(self.vertical_scroll, max_scroll)
 
         # Draw visible passenger rows
         for i in range(min(visible_rows, total_rows - self.vertical_scroll)):
             row_idx = i + self.vertical_scroll
-            if row_idx >= len(active_passengers):
-                break
-
-            passenger = active_passengers[row_idx]
+            passenger = self.row_segments[row_idx][bisect_right(self.row_starts[row_idx], self.last_update) - 1][0]
             row_y = chart_y + i * self.row_height
 
             # Draw row background (alternating colors)
@@ -460,30 +438,22 @@ class GanttChart:
                              (chart_x, row_y + self.row_height),
                              (chart_x + chart_width, row_y + self.row_height), 1)
 
-            # Draw passenger ID label
-            id_label = small_font.render(f"P{passenger.id}", True, BLACK)
+            # Draw the ID of the row's latest passenger
+            id_label = render_text(small_font, f"P{passenger.id}", BLACK)
             screen.blit(id_label, (chart_x - id_label.get_width() - 5,
                                    row_y + (self.row_height - id_label.get_height()) // 2))
 
-        # Draw passenger blocks
-        for passenger, start_time, end_time in self.timeline:
-            # Skip if outside the current time view
-            if end_time < self.scroll_position or start_time > self.scroll_position + self.display_time:
-                continue
-
-            # Find the row index for this passenger
-            try:
-                passenger_idx = active_passengers.index(passenger)
-                # Skip if outside the current vertical view
-                if passenger_idx < self.vertical_scroll or passenger_idx >= self.vertical_scroll + visible_rows:
-                    continue
-
-                # Calculate row position
-                row_idx = passenger_idx - self.vertical_scroll
+        # Draw passenger blocks, visiting only the segments inside the visible rows and time window
+        window_end = self.scroll_position + self.display_time
+        for row_idx in range(min(visible_rows, total_rows - self.vertical_scroll)):
+            for passenger, start_time, end_time in self.visible_segments(row_idx + self.vertical_scroll, self.scroll_position,
+                                                                         min(window_end, self.last_update)):
+                if end_time is None or end_time > self.last_update:
+                    end_time = self.last_update  # Still riding
 
                 # Calculate block position and size
                 block_start = max(start_time, self.scroll_position)
-                block_end = min(end_time, self.scroll_position + self.display_time)
+                block_end = min(end_time, window_end)
 
                 block_x = chart_x + ((block_start - self.scroll_position) / self.display_time) * chart_width
                 block_width = ((block_end - block_start) / self.display_time) * chart_width
@@ -501,12 +471,9 @@ class GanttChart:
 
                     # Draw passenger ID if there's enough space
                     if block_width > 30:
-                        id_text = small_font.render(f"P{passenger.id}", True, BLACK)
+                        id_text = render_text(small_font, f"P{passenger.id}", BLACK)
                         screen.blit(id_text, (block_x + (block_width - id_text.get_width()) // 2,
                                               block_y + (block_height - id_text.get_height()) // 2))
-            except ValueError:
-                # Passenger not in active_passengers list
-                continue
 
         # Draw current time marker
         if current_time >= self.scroll_position and current_time <= self.scroll_position + self.display_time:
@@ -569,6 +536,26 @@ class StatsTable:
         self.scroll_position = 0
         self.scroll_offset = 0
         self.max_visible_rows = 0
+        self.row_cache = OrderedDict()  # Passenger ID -> rendered row, completed rows never change
+
+    def render_row(self, passenger, col_widths):
+        """Render the cells of one completed passenger's row onto a transparent surface"""
+        cells = [
+            f"P{passenger.id}",
+            f"{passenger.arrival_time:.1f}s",
+            f"{passenger.ride_time:.1f}s",
+            f"{passenger.start_time:.1f}s" if passenger.start_time != -1 else "N/A",
+            f"{passenger.completion_time:.1f}s" if passenger.completion_time != -1 else "N/A",
+            f"{passenger.wait_time:.1f}s",
+            f"{passenger.turnaround_time:.1f}s",
+        ]
+
+        row = pygame.Surface((sum(col_widths), self.row_height - 5), pygame.SRCALPHA)
+        col_x = 0
+        for cell, col_width in zip(cells, col_widths):
+            row.blit(render_text(small_font, cell, BLACK), (col_x, 0))
+            col_x += col_width
+        return row
 
     def draw(self, screen, completed_passengers, current_time):
         # Draw table background with rounded corners
@@ -580,7 +567,7 @@ class StatsTable:
                          2, border_radius=10)
 
         # Draw table title with improved styling
-        title_text = title_font.render("Passenger Statistics", True, BLACK)
+        title_text = render_text(title_font, "Passenger Statistics", BLACK)
         title_width = title_text.get_width()
 
         # Draw title background
@@ -620,7 +607,7 @@ class StatsTable:
         # Draw header text and separators
         x_pos = self.x + 10
         for i, header in enumerate(headers):
-            header_text = header_font.render(header, True, BLACK)
+            header_text = render_text(header_font, header, BLACK)
             screen.blit(header_text, (x_pos, header_y + 5))
 
             # Draw vertical separator
@@ -644,14 +631,13 @@ class StatsTable:
         self.max_visible_rows = int((self.height - row_y + self.y - 10) // self.row_height)
         self.max_visible_rows = max(1, self.max_visible_rows)
 
-        # Calculate maximum scroll offset
-        max_scroll = max(0, len(completed_passengers) - self.max_visible_rows)
+        # Only the recent completions kept in memory can be scrolled through
+        available = len(completed_passengers.recent)
+        max_scroll = max(0, available - self.max_visible_rows)
         self.scroll_offset = min(self.scroll_offset, max_scroll)
 
-        # Get the slice of passengers to display based on scroll position
-        start_idx = max(0, len(completed_passengers) - self.max_visible_rows - self.scroll_offset)
-        end_idx = len(completed_passengers) - self.scroll_offset
-        passengers_to_show = completed_passengers[start_idx:end_idx] if len(completed_passengers) > 0 else []
+        # Get the rows to display based on scroll position
+        passengers_to_show = completed_passengers.latest(self.max_visible_rows, self.scroll_offset)
 
         for i, passenger in enumerate(passengers_to_show):
             if row_y + self.row_height > self.y + self.height - 5:
@@ -662,46 +648,10 @@ class StatsTable:
                 pygame.draw.rect(screen, (230, 235, 240),
                                  (self.x + 1, row_y, self.width - 2, self.row_height))
 
-            # Draw row data
-            col_x = self.x + 10
-
-            # Passenger ID
-            pid_text = small_font.render(f"P{passenger.id}", True, BLACK)
-            screen.blit(pid_text, (col_x, row_y + 5))
-            col_x += col_widths[0]
-
-            # Arrival Time
-            arrival_text = small_font.render(f"{passenger.arrival_time:.1f}s", True, BLACK)
-            screen.blit(arrival_text, (col_x, row_y + 5))
-            col_x += col_widths[1]
-
-            # Ride Time
-            ride_text = small_font.render(f"{passenger.ride_time:.1f}s", True, BLACK)
-            screen.blit(ride_text, (col_x, row_y + 5))
-            col_x += col_widths[2]
-
-            # Start Time
-            start_time = passenger.start_time if passenger.start_time != -1 else "N/A"
-            start_text = small_font.render(f"{start_time:.1f}s" if start_time != "N/A" else start_time, True, BLACK)
-            screen.blit(start_text, (col_x, row_y + 5))
-            col_x += col_widths[3]
-
-            # Completion Time
-            completion_time = passenger.completion_time if passenger.completion_time != -1 else "N/A"
-            completion_text = small_font.render(
-                f"{completion_time:.1f}s" if completion_time != "N/A" else completion_time, True, BLACK)
-            screen.blit(completion_text, (col_x, row_y + 5))
-            col_x += col_widths[4]
-
-            # Wait Time
-            wait_text = small_font.render(f"{passenger.wait_time:.1f}s", True, BLACK)
-            screen.blit(wait_text, (col_x, row_y + 5))
-            col_x += col_widths[5]
-
-            # Turnaround Time
-            turnaround_time = passenger.turnaround_time
-            turnaround_text = small_font.render(f"{turnaround_time:.1f}s", True, BLACK)
-            screen.blit(turnaround_text, (col_x, row_y + 5))
+            # Draw row data, formatted once per passenger
+            row_surface = cached_surface(self.row_cache, passenger.id, ROW_CACHE_SIZE,
+                                         lambda: self.render_row(passenger, col_widths))
+            screen.blit(row_surface, (self.x + 10, row_y + 5))
 
             # Update for next row
             row_y += self.row_height
@@ -713,9 +663,9 @@ class StatsTable:
                              1)
 
         # Draw scroll indicators if needed
-        if len(completed_passengers) > self.max_visible_rows:
+        if available > self.max_visible_rows:
             # Draw up arrow if not at top
-            if self.scroll_offset < len(completed_passengers) - self.max_visible_rows:
+            if self.scroll_offset < available - self.max_visible_rows:
                 pygame.draw.polygon(screen, DARK_GRAY,
                                     [(self.x + self.width - 20, self.y + 50),
                                      (self.x + self.width - 30, self.y + 65),
@@ -736,13 +686,13 @@ class AverageStatsPanel:
         self.width = width
         self.height = height
 
-    def draw(self, screen, waiting_passengers, onboard_passengers, completed_passengers, current_time, bus_utilization, total_passengers_generated):
+    def draw(self, screen, summary):
         # Draw panel background
         pygame.draw.rect(screen, PANEL_BG, (self.x, self.y, self.width, self.height), border_radius=10)
         pygame.draw.rect(screen, PANEL_BORDER, (self.x, self.y, self.width, self.height), 2, border_radius=10)
 
         # Draw title
-        title_text = title_font.render("Average Statistics", True, BLACK)
+        title_text = render_text(title_font, "Average Statistics", BLACK)
         screen.blit(title_text, (self.x + (self.width - title_text.get_width()) // 2, self.y + 10))
 
         # Draw horizontal separator
@@ -751,169 +701,199 @@ class AverageStatsPanel:
                          (self.x + self.width - 5, self.y + 40),
                          1)
 
-        # Calculate averages based on completed passengers
-        if completed_passengers:
-            avg_wait_time = sum(p.wait_time for p in completed_passengers) / len(completed_passengers)
-            avg_turnaround = sum(p.turnaround_time for p in completed_passengers) / len(completed_passengers)
-            avg_response = sum(max(0, p.start_time - p.arrival_time) for p in completed_passengers) / len(
-                completed_passengers)
-            avg_ride = sum(p.ride_time for p in completed_passengers) / len(completed_passengers)
-            throughput = len(completed_passengers) / max(1, current_time)  # Passengers per second
-        else:
-            avg_wait_time = 0
-            avg_turnaround = 0
-            avg_response = 0
-            avg_ride = 0
-            throughput = 0
-
-        # Draw statistics
+        # Draw statistics, read from the simulation's running accumulators
         stats = [
-            f"Total Passengers: {total_passengers_generated}",
-            f"Waiting: {len([p for p in waiting_passengers if p.state == 'waiting'])}",
-            f"On Bus: {len(onboard_passengers)}",
-            f"Completed: {len(completed_passengers)}",
-            f"Average Wait Time: {avg_wait_time:.2f}s",
-            f"Average Response Time: {avg_response:.2f}s",
-            f"Average Ride Time: {avg_ride:.2f}s",
-            f"Average Turnaround Time: {avg_turnaround:.2f}s",
-            f"Throughput: {throughput:.2f} pass/s",
-            f"Bus Utilization: {bus_utilization:.1f}%"
+            f"Total Passengers: {summary['total_passengers']}",
+            f"Waiting: {summary['waiting']}",
+            f"On Bus: {summary['onboard']}",
+            f"Completed: {summary['completed']}",
+            f"Average Wait Time: {summary['avg_wait_time']:.2f}s (σ {summary['stdev_wait_time']:.2f})",
+            f"Average Response Time: {summary['avg_response_time']:.2f}s (σ {summary['stdev_response_time']:.2f})",
+            f"Average Ride Time: {summary['avg_ride_time']:.2f}s (σ {summary['stdev_ride_time']:.2f})",
+            f"Average Turnaround Time: {summary['avg_turnaround_time']:.2f}s (σ {summary['stdev_turnaround_time']:.2f})",
+            f"Throughput: {summary['throughput']:.2f} pass/s",
+            f"Bus Utilization: {summary['bus_utilization']:.1f}%",
+            f"Wait p50/90/99: {summary['p50_wait_time']:.1f}/{summary['p90_wait_time']:.1f}/{summary['p99_wait_time']:.1f}s",
+            f"Response p50/90/99: {summary['p50_response_time']:.1f}/{summary['p90_response_time']:.1f}/"
+            f"{summary['p99_response_time']:.1f}s",
+            f"Turnaround p50/90/99: {summary['p50_turnaround_time']:.1f}/{summary['p90_turnaround_time']:.1f}/"
+            f"{summary['p99_turnaround_time']:.1f}s",
         ]
 
         for i, stat in enumerate(stats):
-            stat_text = font.render(stat, True, BLACK)
+            stat_text = render_text(font, stat, BLACK)
             screen.blit(stat_text, (self.x + 20, self.y + 60 + i * 25))
 
 
-class BusSimulation:
-    def __init__(self):
-        self.reset()
+class BusSimulation(simulation.Simulation):
+    """Pygame view driving the headless simulation at FPS"""
+    passenger_class = Passenger
+    bus_class = Bus
+    controls_hint = "Controls: SPACE = Pause, R = Reset, N = New Passenger, P = Policy, F5/F9 = Save/Load, ←/→/↑/↓ = Chart"
 
     def reset(self):
-        self.bus = Bus()
-        self.waiting_passengers = []
-        self.completed_passengers = []
-        self.passenger_counter = 1
-        self.time = 0  # Simulation time in seconds
+        super().reset()
+        self.reset_view()
+
+    def reset_view(self):
+        """Set up the panels and scenery for a fresh or restored run"""
+        self.show_policy()
         self.frames = 0
         self.paused = False
-        self.auto_generate = True
-        self.simulation_ended = False  # Flag to track if simulation has reached time limit
-        self.all_generated_passengers = []  # Track all passengers ever generated
-        self.total_passengers_generated = 0  # Counter for total passengers generated
+        self.queue_boarded = [0] * len(self.config.bus_stops)  # StopQueue.boarded at each stop's last layout
 
         # Create bus stops
         self.bus_stops = []
-        for i, x in enumerate(BUS_STOPS):
+        for i, x in enumerate(self.config.bus_stops):
             self.bus_stops.append(BusStopSign(x, BUS_STOP_Y - 60, i + 1))
 
         # Create stats panel - moved to top left
-        self.stats_panel = AverageStatsPanel(20, 20, 280, 300)
+        self.stats_panel = AverageStatsPanel(20, 20, 280, 380)
 
         # Create Gantt chart - moved to top right
         self.gantt_chart = GanttChart(320, 20, WIDTH - 340, 150)
-        self.gantt_chart.display_time = 30  # Show full 30 seconds in Gantt chart
+        self.gantt_chart.display_time = math.ceil(self.config.max_simulation_time)  # Show the whole run in the Gantt chart
+        self.gantt_chart.cutoff_time = self.config.passenger_generation_cutoff
 
         # Create stats table - moved below Gantt chart
         self.stats_table = StatsTable(320, 190, WIDTH - 340, 200)
 
-    def generate_random_passenger(self):
-        """Generate a random passenger with sensible parameters"""
-        ride_time = random.uniform(MIN_RIDE_TIME, MAX_RIDE_TIME)
-        stop_index = random.randint(0, len(BUS_STOPS) - 1)
-        passenger = Passenger(self.passenger_counter, self.time, ride_time, stop_index)
-        self.passenger_counter += 1
-        self.all_generated_passengers.append(passenger)  # Track all generated passengers
-        self.total_passengers_generated += 1  # Increment total passenger counter
-        return passenger
+        # Static scenery, painted once and used to erase last frame's sprites
+        self.background = self.render_background()
+        self.scene_rects = []  # Screen areas of the sprites drawn last frame
+        self.table_state = None  # What the stats table showed when it was last drawn
+        self.full_redraw = True  # Repaint and push the whole screen on the next frame
+
+    def set_boarding_policy(self, name):
+        super().set_boarding_policy(name)
+        self.show_policy()
+
+    def show_policy(self):
+        pygame.display.set_caption(f"Bus {self.boarding_policy.label} Scheduling Animation with Gantt Chart")
+
+    def set_state(self, state):
+        super().set_state(state)
+        self.reset_view()
+
+        # Restored passengers stand straight in their spot in line, the Gantt chart starts with the riders on board
+        for stop_idx, queue in enumerate(self.stop_queues):
+            self.arrange_waiting_passengers(stop_idx)
+            for passenger in queue:
+                passenger.x, passenger.y = passenger.target_x, passenger.target_y
+                passenger.moving = False
+        for bus in self.buses:
+            bus.seat_passengers()
+        self.gantt_chart.update(self.onboard_passengers, self.time)
+
+    def add_passenger(self, passenger):
+        super().add_passenger(passenger)
+
+        # Only the newcomer needs a spot, at the back of the line at their stop
+        if passenger.state == "waiting":
+            passenger.x = self.config.bus_stops[passenger.stop_index]
+            self.place_in_queue(passenger, len(self.stop_queues[passenger.stop_index]) - 1)
 
     def handle_events(self):
-        """Process pygame events"""
+        """Process pygame events, returning False once the window should close"""
         for event in pygame.event.get():
-            if event.type == pygame.QUIT:
+            if not self.handle_event(event):
                 return False
+        return True
 
-            elif event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_ESCAPE:
-                    return False
-                elif event.key == pygame.K_SPACE:
-                    self.paused = not self.paused
-                elif event.key == pygame.K_r:
-                    self.reset()
-                elif event.key == pygame.K_a:
-                    self.auto_generate = not self.auto_generate
-                elif event.key == pygame.K_n:
-                    # Manually add a new passenger if before cutoff time
-                    if self.time < PASSENGER_GENERATION_CUTOFF:
-                        new_passenger = self.generate_random_passenger()
-                        self.waiting_passengers.append(new_passenger)
-                        self.arrange_waiting_passengers()
-                    else:
-                        # Display a message that passenger generation is stopped
-                        print("Passenger generation stopped after 25 seconds")
-                elif event.key == pygame.K_RIGHT:
-                    # Scroll Gantt chart forward
-                    self.gantt_chart.scroll_position += 5
-                elif event.key == pygame.K_LEFT:
-                    # Scroll Gantt chart backward
+    def handle_event(self, event):
+        """React to one pygame event, returning False if it asks to quit"""
+        if event.type == pygame.QUIT:
+            return False
+
+        elif event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_ESCAPE:
+                return False
+            elif event.key == pygame.K_SPACE:
+                self.paused = not self.paused
+            elif event.key == pygame.K_r:
+                self.reset()
+            elif event.key == pygame.K_F5:
+                if self.checkpoint_path is not None:
+                    self.save_checkpoint()
+            elif event.key == pygame.K_F9:
+                if self.checkpoint_path is not None and os.path.exists(self.checkpoint_path):
+                    self.restore_checkpoint()
+            elif event.key == pygame.K_p:
+                # Cycle through the boarding policies
+                names = list(POLICIES)
+                self.set_boarding_policy(names[(names.index(self.boarding_policy.name) + 1) % len(names)])
+            elif event.key == pygame.K_a:
+                self.auto_generate = not self.auto_generate
+            elif event.key == pygame.K_n:
+                # Manually add a new passenger if before cutoff time
+                if self.time < self.config.passenger_generation_cutoff:
+                    self.add_passenger(self.generate_random_passenger())
+                else:
+                    # Display a message that passenger generation is stopped
+                    print(f"Passenger generation stopped after {self.config.passenger_generation_cutoff:g} seconds")
+            elif event.key == pygame.K_RIGHT:
+                # Scroll Gantt chart forward
+                self.gantt_chart.scroll_position += 5
+            elif event.key == pygame.K_LEFT:
+                # Scroll Gantt chart backward
+                self.gantt_chart.scroll_position = max(0, self.gantt_chart.scroll_position - 5)
+            elif event.key == pygame.K_UP:
+                # Scroll Gantt chart up
+                self.gantt_chart.vertical_scroll = max(0, self.gantt_chart.vertical_scroll - 1)
+            elif event.key == pygame.K_DOWN:
+                # Scroll Gantt chart down
+                self.gantt_chart.vertical_scroll += 1
+
+        elif event.type == pygame.MOUSEBUTTONDOWN:
+            # Check if clicked on Gantt chart scroll buttons
+            if event.button == 1:  # Left click
+                if (self.gantt_chart.x + 20 <= event.pos[0] <= self.gantt_chart.x + 35 and
+                        self.gantt_chart.y + self.gantt_chart.height // 2 - 10 <= event.pos[
+                            1] <= self.gantt_chart.y + self.gantt_chart.height // 2 + 10):
+                    # Left scroll button
                     self.gantt_chart.scroll_position = max(0, self.gantt_chart.scroll_position - 5)
-                elif event.key == pygame.K_UP:
-                    # Scroll Gantt chart up
+                elif (self.gantt_chart.x + self.gantt_chart.width - 35 <= event.pos[
+                    0] <= self.gantt_chart.x + self.gantt_chart.width - 20 and
+                      self.gantt_chart.y + self.gantt_chart.height // 2 - 10 <= event.pos[
+                          1] <= self.gantt_chart.y + self.gantt_chart.height // 2 + 10):
+                    # Right scroll button
+                    self.gantt_chart.scroll_position += 5
+
+                # Check for vertical scroll buttons in Gantt chart
+                chart_x = self.gantt_chart.x + self.gantt_chart.width - 15
+                chart_y = self.gantt_chart.y + 50
+                chart_height = self.gantt_chart.height - 70
+
+                # Up arrow
+                if (chart_x <= event.pos[0] <= chart_x + 10 and
+                        chart_y - 15 <= event.pos[1] <= chart_y - 5):
                     self.gantt_chart.vertical_scroll = max(0, self.gantt_chart.vertical_scroll - 1)
-                elif event.key == pygame.K_DOWN:
-                    # Scroll Gantt chart down
+
+                # Down arrow
+                if (chart_x <= event.pos[0] <= chart_x + 10 and
+                        chart_y + chart_height + 5 <= event.pos[1] <= chart_y + chart_height + 15):
                     self.gantt_chart.vertical_scroll += 1
 
-            elif event.type == pygame.MOUSEBUTTONDOWN:
-                # Check if clicked on Gantt chart scroll buttons
-                if event.button == 1:  # Left click
-                    if (self.gantt_chart.x + 20 <= event.pos[0] <= self.gantt_chart.x + 35 and
-                            self.gantt_chart.y + self.gantt_chart.height // 2 - 10 <= event.pos[
-                                1] <= self.gantt_chart.y + self.gantt_chart.height // 2 + 10):
-                        # Left scroll button
-                        self.gantt_chart.scroll_position = max(0, self.gantt_chart.scroll_position - 5)
-                    elif (self.gantt_chart.x + self.gantt_chart.width - 35 <= event.pos[
-                        0] <= self.gantt_chart.x + self.gantt_chart.width - 20 and
-                          self.gantt_chart.y + self.gantt_chart.height // 2 - 10 <= event.pos[
-                              1] <= self.gantt_chart.y + self.gantt_chart.height // 2 + 10):
-                        # Right scroll button
-                        self.gantt_chart.scroll_position += 5
-
-                    # Check for vertical scroll buttons in Gantt chart
-                    chart_x = self.gantt_chart.x + self.gantt_chart.width - 15
-                    chart_y = self.gantt_chart.y + 50
-                    chart_height = self.gantt_chart.height - 70
-
-                    # Up arrow
-                    if (chart_x <= event.pos[0] <= chart_x + 10 and
-                            chart_y - 15 <= event.pos[1] <= chart_y - 5):
-                        self.gantt_chart.vertical_scroll = max(0, self.gantt_chart.vertical_scroll - 1)
-
-                    # Down arrow
-                    if (chart_x <= event.pos[0] <= chart_x + 10 and
-                            chart_y + chart_height + 5 <= event.pos[1] <= chart_y + chart_height + 15):
-                        self.gantt_chart.vertical_scroll += 1
-
-                # Handle mouse wheel scrolling for stats table
-                elif event.button == 4:  # Scroll up
-                    if (self.stats_table.x <= event.pos[0] <= self.stats_table.x + self.stats_table.width and
-                            self.stats_table.y <= event.pos[1] <= self.stats_table.y + self.stats_table.height):
-                        self.stats_table.scroll_offset = min(
-                            len(self.completed_passengers) - self.stats_table.max_visible_rows,
-                            self.stats_table.scroll_offset + 1
-                        )
-                        self.stats_table.scroll_offset = max(0, self.stats_table.scroll_offset)
-                    elif (self.gantt_chart.x <= event.pos[0] <= self.gantt_chart.x + self.gantt_chart.width and
-                          self.gantt_chart.y <= event.pos[1] <= self.gantt_chart.y + self.gantt_chart.height):
-                        self.gantt_chart.vertical_scroll = max(0, self.gantt_chart.vertical_scroll - 1)
-
-                elif event.button == 5:  # Scroll down
-                    if (self.stats_table.x <= event.pos[0] <= self.stats_table.x + self.stats_table.width and
-                            self.stats_table.y <= event.pos[1] <= self.stats_table.y + self.stats_table.height):
-                        self.stats_table.scroll_offset = max(0, self.stats_table.scroll_offset - 1)
-                    elif (self.gantt_chart.x <= event.pos[0] <= self.gantt_chart.x + self.gantt_chart.width and
-                          self.gantt_chart.y <= event.pos[1] <= self.gantt_chart.y + self.gantt_chart.height):
-                        self.gantt_chart.vertical_scroll += 1
+            # Handle mouse wheel scrolling for stats table
+            elif event.button == 4:  # Scroll up
+                if (self.stats_table.x <= event.pos[0] <= self.stats_table.x + self.stats_table.width and
+                        self.stats_table.y <= event.pos[1] <= self.stats_table.y + self.stats_table.height):
+                    self.stats_table.scroll_offset = min(
+                        len(self.completed_passengers.recent) - self.stats_table.max_visible_rows,
+                        self.stats_table.scroll_offset + 1
+                    )
+                    self.stats_table.scroll_offset = max(0, self.stats_table.scroll_offset)
+                elif (self.gantt_chart.x <= event.pos[0] <= self.gantt_chart.x + self.gantt_chart.width and
+                      self.gantt_chart.y <= event.pos[1] <= self.gantt_chart.y + self.gantt_chart.height):
+                    self.gantt_chart.vertical_scroll = max(0, self.gantt_chart.vertical_scroll - 1)
+
+            elif event.button == 5:  # Scroll down
+                if (self.stats_table.x <= event.pos[0] <= self.stats_table.x + self.stats_table.width and
+                        self.stats_table.y <= event.pos[1] <= self.stats_table.y + self.stats_table.height):
+                    self.stats_table.scroll_offset = max(0, self.stats_table.scroll_offset - 1)
+                elif (self.gantt_chart.x <= event.pos[0] <= self.gantt_chart.x + self.gantt_chart.width and
+                      self.gantt_chart.y <= event.pos[1] <= self.gantt_chart.y + self.gantt_chart.height):
+                    self.gantt_chart.vertical_scroll += 1
 
         return True
 
@@ -929,144 +909,155 @@ class BusSimulation:
         if self.frames % SIMULATION_SPEED != 0:
             return
 
-        # Update simulation time
-        time_delta = 1 / FPS
-        self.time += time_delta
-
-        # Check if simulation time limit has been reached
-        if self.time >= MAX_SIMULATION_TIME:
-            # When time limit is reached, pause the simulation instead of ending it
+        # Advance the headless simulation, pausing once the time limit is reached
+        if not self.step():
             self.paused = True
             return
 
-        # Update bus
-        self.bus.update(time_delta, self.waiting_passengers)
-
-        # Update all passengers
-        for passenger in self.waiting_passengers:
-            passenger.update(self.time, time_delta)
-
-        for passenger in self.bus.passengers:
-            passenger.update(self.time, time_delta)
+        # Close up the lines that lost passengers to the bus this tick
+        for stop_idx, queue in enumerate(self.stop_queues):
+            if queue.boarded != self.queue_boarded[stop_idx]:
+                self.arrange_waiting_passengers(stop_idx)
 
-        # Move completed passengers to the completed list
-        for passenger in self.bus.passengers[:]:
-            if passenger.state == "completed":
-                self.completed_passengers.append(passenger)
-                self.bus.passengers.remove(passenger)
+            # Animate passengers walking to their spot in line
+            for passenger in queue:
+                passenger.animate()
 
         # Update Gantt chart
-        self.gantt_chart.update(self.bus.passengers, self.time)
-
-        # Generate new passengers only before the cutoff time
-        if self.auto_generate and self.time < PASSENGER_GENERATION_CUTOFF:
-            # Adjust generation rate based on remaining time
-            time_factor = 1.0 - (self.time / PASSENGER_GENERATION_CUTOFF)
-            adjusted_rate = PASSENGER_GENERATION_RATE * (1.0 + time_factor)
-
-            if random.random() < adjusted_rate:
-                new_passenger = self.generate_random_passenger()
-                self.waiting_passengers.append(new_passenger)
-
-                # Arrange waiting passengers at each stop
-                self.arrange_waiting_passengers()
-
-    def arrange_waiting_passengers(self):
-        """Arrange waiting passengers in a queue at each bus stop"""
-        # Group passengers by stop
-        passengers_by_stop = {}
-        for stop_idx in range(len(BUS_STOPS)):
-            passengers_by_stop[stop_idx] = []
-
-        for passenger in self.waiting_passengers:
-            if passenger.state == "waiting":
-                passengers_by_stop[passenger.stop_index].append(passenger)
-
-        # Sort passengers at each stop by arrival time (FCFS)
-        for stop_idx, passengers in passengers_by_stop.items():
-            passengers.sort(key=lambda p: p.arrival_time)
-
-            # Arrange passengers in a queue
-            stop_x = BUS_STOPS[stop_idx]
-            for i, passenger in enumerate(passengers):
-                row = i // 5
-                col = i % 5
-                passenger.target_x = stop_x - 40 + col * 20
-                passenger.target_y = BUS_STOP_Y - 30 - row * 25
-                passenger.moving = True
-
-    def draw(self, screen):
-        """Draw the simulation state to the screen"""
-        # Draw background
-        screen.fill(SKY_BLUE)
+        self.gantt_chart.update(self.onboard_passengers, self.time)
+
+    def place_in_queue(self, passenger, slot):
+        """Send a waiting passenger to the given slot of the line at their stop"""
+        row = slot // 5
+        col = slot % 5
+        passenger.queue_slot = slot
+        passenger.target_x = self.config.bus_stops[passenger.stop_index] - 40 + col * 20
+        passenger.target_y = BUS_STOP_Y - 30 - row * 25
+        passenger.moving = True
+
+    def arrange_waiting_passengers(self, stop_idx):
+        """Shift the line at one bus stop forward after passengers boarded"""
+        # The queue iterates in arrival order whatever the boarding policy, so only moved passengers need new targets
+        queue = self.stop_queues[stop_idx]
+        for slot, passenger in enumerate(queue):
+            if passenger.queue_slot != slot:
+                self.place_in_queue(passenger, slot)
+        self.queue_boarded[stop_idx] = queue.boarded
+
+    def render_background(self):
+        """Paint the scenery that never changes (sky, grass, road, stop signs, info panel) onto its own surface"""
+        background = pygame.Surface((WIDTH, HEIGHT)).convert()
+        background.fill(SKY_BLUE)
 
         # Draw grass
-        pygame.draw.rect(screen, GRASS_GREEN, (0, BUS_STOP_Y + 20, WIDTH, HEIGHT - BUS_STOP_Y - 20))
+        pygame.draw.rect(background, GRASS_GREEN, (0, BUS_STOP_Y + 20, WIDTH, HEIGHT - BUS_STOP_Y - 20))
 
         # Draw road
-        pygame.draw.rect(screen, ROAD_GRAY, (0, BUS_STOP_Y, WIDTH, 20))
+        pygame.draw.rect(background, ROAD_GRAY, (0, BUS_STOP_Y, WIDTH, 20))
 
         # Draw road markings
         for i in range(0, WIDTH, 40):
-            pygame.draw.rect(screen, YELLOW, (i, BUS_STOP_Y + 10 - 2, 20, 4))
+            pygame.draw.rect(background, YELLOW, (i, BUS_STOP_Y + 10 - 2, 20, 4))
 
         # Draw bus stops
         for bus_stop in self.bus_stops:
-            bus_stop.draw(screen)
-
-        # Draw waiting passengers
-        for passenger in self.waiting_passengers:
-            passenger.draw(screen)
+            bus_stop.draw(background)
 
-        # Draw bus
-        self.bus.draw(screen)
+        # Draw the compact info panel at the bottom
+        pygame.draw.rect(background, PANEL_BG, (0, HEIGHT - INFO_PANEL_HEIGHT, WIDTH, INFO_PANEL_HEIGHT))
+        pygame.draw.line(background, PANEL_BORDER, (0, HEIGHT - INFO_PANEL_HEIGHT), (WIDTH, HEIGHT - INFO_PANEL_HEIGHT), 2)
+        return background
 
-        # Calculate bus utilization
-        total_time = max(1, self.time)
-        bus_utilization = (self.bus.busy_time / total_time) * 100
-
-        # Draw stats panel with accurate total passenger count
-        self.stats_panel.draw(screen, self.waiting_passengers, self.bus.passengers,
-                              self.completed_passengers, self.time, bus_utilization,
-                              self.total_passengers_generated)
+    def draw(self, screen):
+        """Draw the simulation state to the screen, pushing only the areas that changed"""
+        if self.full_redraw:
+            screen.blit(self.background, (0, 0))
+            self.scene_rects = []
+            self.table_state = None
+
+        # Erase last frame's sprites back to the scenery
+        for rect in self.scene_rects:
+            screen.blit(self.background, rect, rect)
+        dirty_rects = self.scene_rects
+        self.scene_rects = []
+
+        # Draw the time until the next bus is due under each stop
+        for stop_idx, bus_stop in enumerate(self.bus_stops):
+            next_arrival = self.approaches.next_arrival(stop_idx)
+            if next_arrival is not None:
+                eta_text = render_text(small_font, f"Next bus: {max(0, next_arrival[0] - self.time):.1f}s", BLACK)
+                self.scene_rects.append(
+                    screen.blit(eta_text, (bus_stop.x - eta_text.get_width() // 2, BUS_STOP_Y + 45)))
+
+        # Draw waiting passengers in one batch of sprite blits
+        self.scene_rects.extend(screen.blits([passenger.sprite() for passenger in self.waiting_passengers]))
+
+        # Draw buses
+        for bus in self.buses:
+            bus.draw(screen)
+            self.scene_rects.append(bus.bounds())
+        dirty_rects = dirty_rects + self.scene_rects
+
+        # Draw stats panel from the running statistics
+        stats_rect = pygame.Rect(self.stats_panel.x, self.stats_panel.y, self.stats_panel.width, self.stats_panel.height)
+        screen.blit(self.background, stats_rect, stats_rect)
+        self.stats_panel.draw(screen, self.summary())
 
         # Draw Gantt chart
+        gantt_rect = pygame.Rect(self.gantt_chart.x, self.gantt_chart.y, self.gantt_chart.width, self.gantt_chart.height)
+        screen.blit(self.background, gantt_rect, gantt_rect)
         self.gantt_chart.draw(screen, self.time)
-
-        # Draw stats table
-        self.stats_table.draw(screen, self.completed_passengers, self.time)
-
-        # Draw simulation time and controls info in a compact panel at the bottom
-        info_panel_height = 60
-        pygame.draw.rect(screen, PANEL_BG, (0, HEIGHT - info_panel_height, WIDTH, info_panel_height))
-        pygame.draw.line(screen, PANEL_BORDER, (0, HEIGHT - info_panel_height), (WIDTH, HEIGHT - info_panel_height), 2)
+        dirty_rects += [stats_rect, gantt_rect]
+
+        # Draw stats table only when its rows changed or sprites drew over it
+        table_rect = pygame.Rect(self.stats_table.x, self.stats_table.y, self.stats_table.width, self.stats_table.height)
+        table_state = (len(self.completed_passengers), self.stats_table.scroll_offset)
+        if table_state != self.table_state or table_rect.collidelist(dirty_rects) != -1:
+            screen.blit(self.background, table_rect, table_rect)
+            self.stats_table.draw(screen, self.completed_passengers, self.time)
+            self.table_state = table_state
+            dirty_rects.append(table_rect)
+
+        # Draw simulation time and controls info in the compact panel at the bottom
+        info_panel_height = INFO_PANEL_HEIGHT
+        info_rect = pygame.Rect(0, HEIGHT - info_panel_height, WIDTH, info_panel_height)
+        screen.blit(self.background, info_rect, info_rect)
+        dirty_rects.append(info_rect)
 
         # Draw simulation time with max time
-        time_text = title_font.render(f"Simulation Time: {self.time:.1f}s / {MAX_SIMULATION_TIME}s", True, BLACK)
+        time_text = render_text(title_font, f"Simulation Time: {self.time:.1f}s / {self.config.max_simulation_time}s", BLACK)
         screen.blit(time_text, (20, HEIGHT - info_panel_height + 10))
 
         # Draw passenger generation status
-        if self.time >= PASSENGER_GENERATION_CUTOFF:
-            gen_status_text = font.render("Passenger Generation: STOPPED (25s cutoff reached)", True, ORANGE)
-        else:
-            gen_status_text = font.render(f"Passenger Generation: {'ON' if self.auto_generate else 'OFF'} (Press A to toggle)", True, BLACK)
+        gen_status_text = render_text(font, *self.status_text())
         screen.blit(gen_status_text, (20, HEIGHT - info_panel_height + 35))
 
         # Draw controls hint
-        controls_text = font.render("Controls: SPACE = Pause, R = Reset, N = New Passenger, ←/→/↑/↓ = Scroll Chart", True, BLACK)
+        controls_text = render_text(font, self.controls_hint, BLACK)
         screen.blit(controls_text, (WIDTH // 2, HEIGHT - info_panel_height + 20))
 
         # Draw simulation status (paused)
         if self.paused:
-            pause_text = title_font.render("PAUSED", True, RED)
+            pause_text = render_text(title_font, "PAUSED", RED)
             screen.blit(pause_text, (WIDTH - pause_text.get_width() - 20, HEIGHT - info_panel_height + 20))
-            # If paused at 30 seconds, show special message
-            if self.time >= MAX_SIMULATION_TIME:
-                time_limit_text = font.render("30 second time limit reached. Press SPACE to continue.", True, BLACK)
+            # If paused at the time limit, show special message
+            if self.simulation_ended:
+                time_limit_text = render_text(
+                    font, f"{self.config.max_simulation_time:g} second time limit reached. Press SPACE to continue.", BLACK)
                 screen.blit(time_limit_text, (WIDTH - time_limit_text.get_width() - 20, HEIGHT - info_panel_height + 45))
 
         # Update display
-        pygame.display.flip()
+        if self.full_redraw:
+            pygame.display.flip()
+            self.full_redraw = False
+        else:
+            pygame.display.update(dirty_rects)
+
+    def status_text(self):
+        """(text, color) of the status line in the info panel"""
+        if self.time >= self.config.passenger_generation_cutoff:
+            return f"Passenger Generation: STOPPED ({self.config.passenger_generation_cutoff:g}s cutoff reached)", ORANGE
+        return f"Passenger Generation: {'ON' if self.auto_generate else 'OFF'} (Press A to toggle)", BLACK
 
     def run(self):
         """Main simulation loop"""
@@ -1087,13 +1078,200 @@ class BusSimulation:
             clock.tick(FPS)
 
 
+class ReplayView(BusSimulation):
+    """Pygame view playing back a recorded .npy trace at any speed, forwards or in reverse
+
+    Nothing is re-simulated: every frame seeks the trace index to the
+    playback clock and rebuilds the stops, buses, panels and Gantt chart
+    as they were at that moment, so jumping anywhere costs the same as
+    playing on. The stops and fleet are laid out from the configuration
+    saved with the trace unless another is given.
+    """
+    controls_hint = "Controls: SPACE = Pause, -/= = Speed, V = Reverse, [/] = Seek 5s, R = Restart"
+
+    def __init__(self, replay_path, config=None):
+        self.replay_path = replay_path
+        self.replay = None  # Index over the trace, built once and kept across restarts
+        if config is None:
+            saved = read_trace_config(replay_path)
+            config = simulation.SimulationConfig(**saved) if saved is not None else None
+        super().__init__(config)
+
+    def reset(self):
+        super().reset()
+        if self.replay is None:
+            self.replay = TraceReplay(self.replay_path, self.config.bus_stops, self.config.bus_speed)
+        if self.replay.bus_count != len(self.buses):
+            raise ValueError(f"trace has {self.replay.bus_count} buses but the viewer is set up for {len(self.buses)}")
+        self.store = self.replay.passenger_store(len(PASSENGER_COLORS))
+        self.views = {}  # Passenger index -> view of the passengers waiting or riding, kept while they are
+        self.boarded = 0
+        self.playback_speed = 1.0  # Simulated seconds per second of playback, negative in reverse
+
+        self.charted_until = -math.inf  # The Gantt chart holds every ride begun or ended up to this time
+        self.seek(0)
+
+    def chart_until(self, time):
+        """Add the rides begun or ended by `time` to the Gantt chart
+
+        The chart is only ever built forwards, up to the furthest point
+        played; seeking back just draws it at an earlier time.
+        """
+        if time <= self.charted_until:
+            return
+        replay = self.replay
+        boarding, alighting = replay.rides_between(self.charted_until, time)
+        # In time order, freeing rows before new rides at the same moment take them
+        rides = sorted([(replay.completion[index], 0, index) for index in alighting.tolist()] +
+                       [(replay.start[index], 1, index) for index in boarding.tolist()])
+        for ride_time, boards, index in rides:
+            if boards:
+                self.gantt_chart.open_ride(simulation.Passenger(self.store, index), ride_time)
+            else:
+                self.gantt_chart.close_ride(index + 1, ride_time)
+        self.charted_until = time
+
+    def view(self, index):
+        """Viewer passenger for a row of the store, reusing the one already on screen"""
+        passenger = self.views.get(index)
+        if passenger is None:
+            passenger = Passenger(self.store, index)
+        return passenger
+
+    def seek(self, time):
+        """Rebuild the scene as it was at `time`, straight from the trace index"""
+        replay = self.replay
+        self.time = min(max(time, 0.0), replay.end_time)
+        arrived, self.boarded, completed = replay.counts_at(self.time)
+        views = {}
+
+        # Waiting lines, in arrival order at each stop
+        self.stop_queues = [StopQueue() for _ in self.config.bus_stops]
+        for index in replay.waiting_at(self.time).tolist():
+            passenger = views[index] = self.view(index)
+            queue = self.stop_queues[passenger.stop_index]
+            queue.append(passenger)
+            if passenger.queue_slot != len(queue) - 1:
+                self.place_in_queue(passenger, len(queue) - 1)
+                if index not in self.views:
+                    # Newly on screen: start in place, only moves along the line are animated
+                    passenger.x, passenger.y = passenger.target_x, passenger.target_y
+                    passenger.moving = False
+
+        # Riders, bus positions and the buses due at each stop
+        for bus in self.buses:
+            bus.passengers = []
+        for index in replay.riding_at(self.time).tolist():
+            views[index] = self.view(index)
+            self.buses[replay.bus_id[index]].passengers.append(views[index])
+        self.approaches = ApproachIndex(len(self.config.bus_stops))
+        for bus, track in zip(self.buses, replay.tracks):
+            bus.x, bus.state, bus.current_stop, eta, bus.busy_time = track.state_at(self.time)
+            bus.total_passengers_served = replay.served_at(bus.id, self.time)
+            if bus.state == "loading":
+                self.approaches.arrive(bus, bus.current_stop)
+            elif eta is not None:
+                self.approaches.approach(bus, bus.current_stop, eta)
+        self.views = views
+
+        # Statistics move forward incrementally and start over when seeking back
+        if completed != self.stats.completed:
+            if completed < self.stats.completed:
+                self.stats = PassengerStats()
+            done = self.stats.completed
+            self.stats.complete_batch({name: values[done:completed]
+                                       for name, values in replay.completed_metrics.items()})
+
+            log = self.completed_passengers
+            log.recent.clear()
+            log.recent.extend(simulation.Passenger(self.store, index)
+                              for index in replay.completed_before(self.time, log.recent.maxlen).tolist())
+            log.total = completed
+        self.stats.arrived = arrived
+        self.total_passengers_generated = arrived
+
+        self.chart_until(self.time)
+        self.gantt_chart.last_update = self.time
+
+    def state_counts(self):
+        return self.stats.state_counts(self.boarded)
+
+    def update(self):
+        """Move the playback clock on by one frame and rebuild the scene there"""
+        if self.paused:
+            return
+
+        time = self.time + TIME_STEP * self.playback_speed
+        if not 0 <= time <= self.replay.end_time:
+            self.paused = True  # Either end of the recording
+        self.seek(time)
+
+        # Animate passengers walking to their spot in line
+        for queue in self.stop_queues:
+            for passenger in queue:
+                passenger.animate()
+
+    def handle_event(self, event):
+        if event.type != pygame.KEYDOWN:
+            return super().handle_event(event)
+
+        if event.key == pygame.K_MINUS:
+            self.playback_speed /= 2
+        elif event.key == pygame.K_EQUALS:
+            self.playback_speed *= 2
+        elif event.key == pygame.K_v:
+            self.playback_speed = -self.playback_speed
+        elif event.key == pygame.K_LEFTBRACKET:
+            self.seek(self.time - 5)
+        elif event.key == pygame.K_RIGHTBRACKET:
+            self.seek(self.time + 5)
+        elif event.key == pygame.K_r:
+            self.seek(0)
+        elif event.key in (pygame.K_a, pygame.K_n, pygame.K_p, pygame.K_F5, pygame.K_F9):
+            pass  # A recording has no passengers to generate, policy to change nor state to save
+        else:
+            return super().handle_event(event)
+        return True
+
+    def status_text(self):
+        direction = "reverse" if self.playback_speed < 0 else "forward"
+        return (f"Replaying {os.path.basename(self.replay_path)}: {abs(self.playback_speed):g}x {direction}, "
+                f"{self.replay.end_time:.1f}s recorded", BLACK)
+
+
 # Create and run the simulation
 def main():
+    parser = argparse.ArgumentParser(description="Animate the bus simulation")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--trace", default=None, metavar="PATH",
+                        help="record every event to a .csv, .npy or .parquet trace")
+    parser.add_argument("--history", default=None, metavar="PATH",
+                        help="write every completed passenger to a CSV file")
+    parser.add_argument("--replay", default=None, metavar="PATH",
+                        help="play back a .npy trace instead of simulating")
+    parser.add_argument("--checkpoint", default=CHECKPOINT_FILE, metavar="PATH",
+                        help="where F5 saves and F9 restores the simulation state")
+    parser.add_argument("--checkpoint-interval", type=float, default=None, metavar="SECONDS",
+                        help="also save a checkpoint every SECONDS of simulated time")
+    parser.add_argument("--resume", default=None, metavar="PATH", help="start from a saved checkpoint")
+    args = parser.parse_args()
+
     # Initialize simulation
-    simulation = BusSimulation()
+    if args.replay is not None:
+        if TraceReplay is None:
+            parser.error("--replay needs NumPy")
+        simulation = ReplayView(args.replay)
+    else:
+        options = {"trace_path": args.trace, "history_path": args.history, "checkpoint_path": args.checkpoint,
+                   "checkpoint_interval": args.checkpoint_interval}
+        if args.resume is not None:
+            simulation = BusSimulation.from_checkpoint(args.resume, **options)
+        else:
+            simulation = BusSimulation(seed=args.seed, **options)
 
     # Run simulation
     simulation.run()
+    simulation.close()
 
     # Clean up
     pygame.quit()
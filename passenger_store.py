@@ -0,0 +1,96 @@
+"""Columnar (structure-of-arrays) storage for passenger records.
+
+Every passenger of a run lives as one row across a handful of typed
+array.array columns, roughly 55 bytes each, instead of a full object with
+its own __dict__. simulation.Passenger is a __slots__ view onto a row,
+and update_onboard() advances many rows at once, with NumPy when it
+is installed.
+"""
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Below this many rows a plain loop over the columns beats NumPy's call overhead
+NUMPY_MIN_BATCH = 32
+
+# Passenger states as stored in the state column
+STATES = ("waiting", "onboard", "completed")
+STATE_CODES = {state: code for code, state in enumerate(STATES)}
+
+# Column name -> array typecode
+COLUMNS = {
+    "arrival_time": "d",  # When the passenger arrives
+    "planned_ride_time": "d",  # Time the route model gives from the boarding stop to the destination
+    "start_time": "d",  # When the passenger boards the bus (-1 until then)
+    "completion_time": "d",  # When the passenger completes journey (-1 until then)
+    "wait_time": "d",  # Time spent waiting at the bus stop, fixed on boarding
+    "service_time": "d",  # Time spent on the bus
+    "stop_index": "h",  # Stop the passenger boards at
+    "destination_stop": "h",  # Stop the passenger gets off at
+    "state": "b",  # Index into STATES
+    "color": "B",  # Index into PASSENGER_COLORS
+    "priority": "B",  # Priority class, 0 first
+}
+
+
+class PassengerStore:
+    """Typed column arrays holding every passenger generated in a run"""
+
+    def __init__(self):
+        for name, typecode in COLUMNS.items():
+            setattr(self, name, array(typecode))
+
+    def __len__(self):
+        return len(self.arrival_time)
+
+    def add(self, arrival_time, planned_ride_time, stop_index, destination_stop, color=0, priority=0):
+        """Append a waiting passenger and return its row index"""
+        self.arrival_time.append(arrival_time)
+        self.planned_ride_time.append(planned_ride_time)
+        self.start_time.append(-1)
+        self.completion_time.append(-1)
+        self.wait_time.append(0)
+        self.service_time.append(0)
+        self.stop_index.append(stop_index)
+        self.destination_stop.append(destination_stop)
+        self.state.append(STATE_CODES["waiting"])
+        self.color.append(color)
+        self.priority.append(priority)
+        return len(self.arrival_time) - 1
+
+    def nbytes(self):
+        """Bytes held by the column buffers"""
+        return sum(getattr(self, name).itemsize * len(self) for name in COLUMNS)
+
+
+def column(name):
+    """Property reading and writing one column of a passenger's row"""
+    def get(self):
+        return getattr(self.store, name)[self.index]
+
+    def set(self, value):
+        getattr(self.store, name)[self.index] = value
+
+    return property(get, set)
+
+
+def update_onboard(store, indices, current_time):
+    """Batch form of Passenger.update for onboard passengers: refresh their service times
+
+    Start and wait times are fixed when a passenger boards and rides end
+    when the bus reaches the destination, so only the time on the bus moves.
+    """
+    if np is not None and len(indices) >= NUMPY_MIN_BATCH:
+        rows = np.fromiter(indices, dtype=np.intp, count=len(indices))
+        start_time = np.frombuffer(store.start_time)
+        service_time = np.frombuffer(store.service_time)
+        service_time[rows] = current_time - start_time[rows]
+        return
+
+    start_time = store.start_time
+    service_time = store.service_time
+    for i in indices:
+        service_time[i] = current_time - start_time[i]
@@ -0,0 +1,219 @@
+"""Random access to a recorded .npy event trace.
+
+TraceReplay memory-maps a trace written by event_trace.NpyTraceWriter
+and indexes it once, reading only the fields it needs: per-passenger
+arrival, boarding and completion times, and per-bus stop arrivals and
+departures. Any moment of the run can then be reconstructed directly.
+Counts and bus positions come from binary searches over sorted times,
+and the passengers waiting or riding at time t are looked up in a window
+bounded by the longest wait and the longest ride, so the past never has
+to be replayed from time zero.
+"""
+import numpy as np
+
+from event_trace import EVENT_CODES, config_path, read_trace_config
+from passenger_store import PassengerStore, STATE_CODES
+
+
+def first_times(ids, times, count):
+    """Array of `count` times indexed by passenger id - 1, inf where an id has no event"""
+    result = np.full(count, np.inf)
+    result[ids - 1] = times
+    return result
+
+
+class BusTrack:
+    """Arrivals at and departures from stops of one bus, in time order"""
+
+    def __init__(self, times, kinds, stops, destinations, bus_stops, bus_speed=None):
+        self.bus_speed = bus_speed  # Carries the bus on along a last leg the trace ends in, if known
+        self.times = times
+        self.arriving = kinds == EVENT_CODES["bus_arrival"]
+        self.stops = stops
+        self.destinations = destinations  # Stop a departure heads for, -1 on an arrival
+        # x of each event's stop, the depot at x = 0 for stop -1
+        stop_x = np.asarray(bus_stops, dtype=float)
+        self.x = np.where(self.stops >= 0, stop_x[self.stops], 0.0)
+        self.destination_x = np.where(self.destinations >= 0, stop_x[self.destinations], 0.0)
+
+        # Driving time accumulated before each event: a departure starts a drive, the next arrival ends it
+        driving = np.zeros(len(self.times))
+        driving[1:] = np.where(self.arriving[1:], np.diff(self.times), 0.0)
+        self.busy_before = np.cumsum(driving)
+
+    def state_at(self, time):
+        """(x, "moving"/"loading", stop heading to or at, eta or None, busy time) at `time`"""
+        i = int(np.searchsorted(self.times, time, side="right")) - 1
+        if i < 0:
+            return 0.0, "moving", int(self.destinations[0]), None, 0.0
+        if self.arriving[i]:
+            return float(self.x[i]), "loading", int(self.stops[i]), None, float(self.busy_before[i])
+
+        # Driving from the stop it left toward the next one, covering the leg evenly up to its arrival
+        elapsed = time - self.times[i]
+        busy = float(self.busy_before[i] + elapsed)
+        if i + 1 < len(self.times):
+            leg = self.times[i + 1] - self.times[i]
+            x = self.x[i] + (self.x[i + 1] - self.x[i]) * (elapsed / leg)
+            return float(x), "moving", int(self.stops[i + 1]), float(self.times[i + 1]), busy
+
+        # The trace ends on this leg, so there is no arrival to go by
+        x = self.x[i]
+        if self.bus_speed is not None:
+            dx = self.destination_x[i] - x
+            x += np.sign(dx) * min(abs(dx), self.bus_speed * elapsed)
+        return float(x), "moving", int(self.destinations[i]), None, busy
+
+
+class TraceReplay:
+    """Index over a recorded trace answering "what did the run look like at time t"
+
+    The stop positions and bus speed come from the configuration saved
+    with the trace unless given.
+    """
+
+    def __init__(self, path, bus_stops=None, bus_speed=None):
+        self.events = np.load(path, mmap_mode="r")
+        self.config = read_trace_config(path) or {}
+        if bus_stops is None:
+            bus_stops = self.config.get("bus_stops")
+            if bus_stops is None:
+                raise ValueError(f"{path} was recorded without {config_path(path)}, pass the stop positions")
+        if bus_speed is None:
+            bus_speed = self.config.get("bus_speed")
+
+        self.times = self.events["time"]
+        self.end_time = float(self.times[-1]) if len(self.times) else 0.0
+        kinds = np.asarray(self.events["kind"])
+
+        def field(name, rows):
+            # One field of some records, copied without the rest of them
+            return np.asarray(self.events[name])[rows]
+
+        # Per-passenger lifecycle, indexed by passenger id - 1 (ids follow arrival order)
+        arrivals = np.flatnonzero(kinds == EVENT_CODES["arrival"])
+        boardings = np.flatnonzero(kinds == EVENT_CODES["boarding"])
+        alightings = np.flatnonzero(kinds == EVENT_CODES["alighting"])
+        arrival_ids = field("passenger_id", arrivals)
+        boarding_ids = field("passenger_id", boardings)
+        self.count = int(arrival_ids.max()) if len(arrivals) else 0
+        self.arrival = first_times(arrival_ids, field("time", arrivals), self.count)
+        self.start = first_times(boarding_ids, field("time", boardings), self.count)
+        self.completion = first_times(field("passenger_id", alightings), field("time", alightings), self.count)
+        arrival_rows = arrival_ids - 1
+        self.stop_index = np.zeros(self.count, dtype=np.int16)
+        self.stop_index[arrival_rows] = field("stop_index", arrivals)
+        self.planned_ride_time = np.zeros(self.count)
+        self.planned_ride_time[arrival_rows] = field("planned_ride_time", arrivals)
+        self.destination_stop = np.zeros(self.count, dtype=np.int16)
+        self.destination_stop[arrival_rows] = field("destination_stop", arrivals)
+        self.bus_id = np.full(self.count, -1, dtype=np.int16)
+        self.bus_id[boarding_ids - 1] = field("bus_id", boardings)
+
+        # Sorted views for counting and for the waiting / riding windows
+        self.arrival_sorted = self.arrival  # Already in order, as ids are handed out on arrival
+        self.board_order = np.argsort(self.start, kind="stable")
+        self.start_sorted = self.start[self.board_order]
+        self.board_rank = np.empty(self.count, dtype=np.intp)  # Position of each passenger in board_order
+        self.board_rank[self.board_order] = np.arange(self.count)
+        self.completion_order = np.argsort(self.completion, kind="stable")
+        self.completion_sorted = self.completion[self.completion_order]
+        boarded = np.isfinite(self.start)
+        finished = np.isfinite(self.completion)
+        self.longest_wait = float((self.start[boarded] - self.arrival[boarded]).max()) if boarded.any() else 0.0
+        self.longest_ride = float((self.completion[finished] - self.start[finished]).max()) if finished.any() else 0.0
+        self.never_boarded = np.nonzero(~boarded)[0]  # Still waiting when the trace ends
+        self.never_finished = np.nonzero(boarded & ~finished)[0]  # Still riding when the trace ends
+
+        # Completed passengers' metrics in completion order, so the stats at t are a prefix
+        done = self.completion_order[:int(finished.sum())]
+        self.completed_metrics = {
+            "wait_time": self.start[done] - self.arrival[done],
+            "response_time": np.maximum(0, self.start[done] - self.arrival[done]),
+            "ride_time": self.completion[done] - self.start[done],
+            "turnaround_time": self.completion[done] - self.arrival[done],
+        }
+
+        # Bus movements and drop-offs at stops, per bus
+        moves = np.flatnonzero((kinds == EVENT_CODES["bus_arrival"]) | (kinds == EVENT_CODES["bus_departure"]))
+        move_buses = field("bus_id", moves)
+        self.bus_count = int(move_buses.max()) + 1 if len(moves) else 0
+        self.tracks = []
+        for bus in range(self.bus_count):
+            rows = moves[move_buses == bus]
+            self.tracks.append(BusTrack(field("time", rows), kinds[rows], field("stop_index", rows),
+                                        field("destination_stop", rows), bus_stops, bus_speed))
+        drop_off_buses = field("bus_id", alightings)
+        drop_off_times = field("time", alightings)
+        self.drop_offs = [drop_off_times[drop_off_buses == bus] for bus in range(self.bus_count)]
+
+    def seek(self, time):
+        """Index of the first event after `time`"""
+        return int(np.searchsorted(self.times, time, side="right"))
+
+    def counts_at(self, time):
+        """Passengers arrived, boarded and completed by `time`"""
+        return (int(np.searchsorted(self.arrival_sorted, time, side="right")),
+                int(np.searchsorted(self.start_sorted, time, side="right")),
+                int(np.searchsorted(self.completion_sorted, time, side="right")))
+
+    def waiting_at(self, time):
+        """Indices of the passengers waiting at `time`, in arrival order"""
+        low = int(np.searchsorted(self.arrival_sorted, time - self.longest_wait, side="left"))
+        high = int(np.searchsorted(self.arrival_sorted, time, side="right"))
+        window = np.arange(low, high)
+        # Passengers who never board wait longer than longest_wait, so those before the window come separately
+        stranded = self.never_boarded[self.never_boarded < low]
+        return np.concatenate([stranded, window[self.start[window] > time]])
+
+    def riding_at(self, time):
+        """Indices of the passengers on a bus at `time`, in boarding order"""
+        low = int(np.searchsorted(self.start_sorted, time - self.longest_ride, side="left"))
+        high = int(np.searchsorted(self.start_sorted, time, side="right"))
+        window = self.board_order[low:high]
+        # Likewise for riders still on board at the end of the trace
+        unfinished = self.never_finished[self.board_rank[self.never_finished] < low]
+        return np.concatenate([unfinished, window[self.completion[window] > time]])
+
+    def rides_between(self, start, end):
+        """Indices of the passengers boarding, and of those getting off, after `start` up to `end`, in time order"""
+        boarding = self.board_order[np.searchsorted(self.start_sorted, start, side="right"):
+                                    np.searchsorted(self.start_sorted, end, side="right")]
+        alighting = self.completion_order[np.searchsorted(self.completion_sorted, start, side="right"):
+                                          np.searchsorted(self.completion_sorted, end, side="right")]
+        return boarding, alighting
+
+    def completed_before(self, time, count):
+        """Indices of up to `count` passengers most recently completed by `time`, oldest first"""
+        done = int(np.searchsorted(self.completion_sorted, time, side="right"))
+        return self.completion_order[max(0, done - count):done]
+
+    def served_at(self, bus, time):
+        """Passengers `bus` dropped off at a stop by `time`"""
+        return int(np.searchsorted(self.drop_offs[bus], time, side="right"))
+
+    def passenger_store(self, color_count):
+        """PassengerStore holding every passenger of the trace with their final times"""
+        boarded = np.isfinite(self.start)
+        finished = np.isfinite(self.completion)
+        service = np.where(finished, self.completion - np.where(boarded, self.start, 0.0), 0.0)
+        columns = {
+            "arrival_time": self.arrival,
+            "planned_ride_time": self.planned_ride_time,
+            "start_time": np.where(boarded, self.start, -1.0),
+            "completion_time": np.where(finished, self.completion, -1.0),
+            "wait_time": np.where(boarded, self.start - self.arrival, 0.0),
+            "service_time": service,
+            "stop_index": self.stop_index,
+            "destination_stop": self.destination_stop,
+            "state": np.where(finished, STATE_CODES["completed"],
+                              np.where(boarded, STATE_CODES["onboard"], STATE_CODES["waiting"])),
+            "color": np.arange(self.count) % color_count,  # Colours aren't traced either
+            "priority": np.zeros(self.count),  # Nor priority classes
+        }
+
+        store = PassengerStore()
+        for name, values in columns.items():
+            column = getattr(store, name)
+            column.frombytes(np.asarray(values, dtype=column.typecode).tobytes())
+        return store
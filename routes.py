@@ -0,0 +1,48 @@
+"""Stop-to-stop travel times over the routes of a fleet.
+
+A bus drives from stop to stop at a fixed speed and dwells a fixed time
+at every stop it calls at, so how long any ride takes follows from the
+stop positions alone. RouteModel works this out once per configuration:
+for each pair of stops, the shortest time from leaving the first to
+arriving at the second on any route calling at both, including the
+dwells at the stops in between. Passengers look their ride time up here
+and ride until their bus actually reaches the destination.
+"""
+import math
+
+
+class RouteModel:
+    """Matrix of ride times between stops, inf where no route connects them"""
+
+    def __init__(self, bus_stops, routes, bus_speed, bus_stop_time, arrival_tolerance=0):
+        self.bus_stops = bus_stops
+        self.bus_speed = bus_speed
+        self.bus_stop_time = bus_stop_time
+        self.arrival_tolerance = arrival_tolerance  # Distance from a stop at which a bus counts as arrived
+        stop_count = len(bus_stops)
+        self.travel_times = [[math.inf] * stop_count for _ in range(stop_count)]
+
+        for route in routes:
+            for start in range(len(route)):
+                origin = route[start]
+                elapsed = 0.0
+                # Follow the loop once around from the origin
+                for hop in range(1, len(route)):
+                    previous = route[(start + hop - 1) % len(route)]
+                    stop = route[(start + hop) % len(route)]
+                    elapsed += self.leg_time(previous, stop)
+                    if stop != origin and elapsed < self.travel_times[origin][stop]:
+                        self.travel_times[origin][stop] = elapsed
+                    elapsed += bus_stop_time  # Dwell before carrying on
+
+        # Stops reachable from each stop without leaving a route that calls there
+        self.destinations = [[stop for stop in range(stop_count) if math.isfinite(self.travel_times[origin][stop])]
+                             for origin in range(stop_count)]
+
+    def leg_time(self, from_stop, to_stop):
+        """Seconds a bus leaving `from_stop` drives before arriving at `to_stop`"""
+        distance = abs(self.bus_stops[to_stop] - self.bus_stops[from_stop])
+        return max(0, distance - self.arrival_tolerance) / self.bus_speed
+
+    def ride_time(self, origin, destination):
+        return self.travel_times[origin][destination]
@@ -0,0 +1,685 @@
+"""Headless core of the bus scheduling simulation.
+
+Passenger and bus state transitions, policy-ordered loading and the run statistics
+live here without any pygame import, so a scenario can be stepped as fast
+as the CPU allows. main.py layers the pygame view on top of these classes.
+"""
+import argparse
+import copy
+import dataclasses
+import math
+import os
+from collections import deque
+from dataclasses import dataclass, field
+
+from arrivals import DecayingRate, arrival_schedule
+from checkpoint import read_checkpoint, write_checkpoint
+from event_trace import open_trace
+from fleet import POLICIES, StopQueue, ApproachIndex
+from history import CompletionLog
+from passenger_store import PassengerStore, COLUMNS, STATES, STATE_CODES, column, update_onboard
+from rng import RandomStreams, STREAMS
+from routes import RouteModel
+from stats import PassengerStats
+
+# Simulation parameters
+FPS = 60
+TIME_STEP = 1 / FPS  # Simulated seconds advanced by one tick
+PASSENGER_GENERATION_RATE = 0.01  # Reduced from 0.03 to slow down passenger generation
+MAX_PASSENGERS = 100  # Increased maximum passengers waiting (was 20)
+BUS_CAPACITY = 10  # Maximum passengers on the bus
+BUS_SPEED = 100  # Pixels per second
+BUS_STOP_TIME = 2  # Seconds to stop at each bus stop
+ARRIVAL_TOLERANCE = 5  # Pixels from a stop at which the bus counts as arrived
+MAX_SIMULATION_TIME = 30  # Maximum simulation time in seconds (changed from 60 to 30)
+PASSENGER_GENERATION_CUTOFF = 25  # Stop generating passengers after this time
+
+# Bus stop positions (x coordinates)
+BUS_STOPS = [150, 350, 550, 750, 950]
+
+# Fleet layout
+ROUTES = [list(range(len(BUS_STOPS)))]  # Stop indices each route loops over
+FLEET_SIZE = 1  # Number of buses, assigned to ROUTES in turn
+
+# Passenger colors
+PASSENGER_COLORS = [
+    (220, 80, 80),  # Red
+    (80, 180, 80),  # Green
+    (80, 120, 220),  # Blue
+    (240, 200, 0),  # Yellow
+    (240, 140, 0),  # Orange
+    (160, 80, 220),  # Purple
+    (0, 180, 200),  # Cyan
+    (180, 100, 140)  # Magenta
+]
+
+
+def tick_at(time):
+    """First tick whose time (tick * TIME_STEP) reaches `time`, ignoring the rounding in that product"""
+    return math.ceil(time / TIME_STEP - 1e-9)
+
+
+def ticks_for(duration):
+    """Whole ticks a bus takes over `duration` seconds of driving or dwelling, at least one"""
+    return max(1, tick_at(duration))
+
+
+@dataclass
+class SimulationConfig:
+    """Tuning knobs of one run, defaulting to the module-level parameters"""
+    passenger_generation_rate: float = PASSENGER_GENERATION_RATE
+    bus_capacity: int = BUS_CAPACITY
+    bus_speed: float = BUS_SPEED
+    bus_stop_time: float = BUS_STOP_TIME
+    max_simulation_time: float = MAX_SIMULATION_TIME
+    passenger_generation_cutoff: float = PASSENGER_GENERATION_CUTOFF
+    fleet_size: int = FLEET_SIZE
+    bus_stops: list = field(default_factory=lambda: list(BUS_STOPS))
+    routes: list = field(default_factory=lambda: [list(route) for route in ROUTES])
+    arrival_rate: object = None  # Rate curve in passengers per second (see arrivals.py), None for the decaying default
+    boarding_policy: str = "fcfs"  # Name of the fleet.POLICIES entry ordering boarding at every stop
+    priority_classes: int = 1  # Priority classes passengers are spread over, 0 boarding first under "priority"
+
+
+class Passenger:
+    """View onto one passenger's row of a PassengerStore"""
+    __slots__ = ("store", "index")
+
+    arrival_time = column("arrival_time")  # When the passenger arrives
+    planned_ride_time = column("planned_ride_time")  # Time the route model gives from the boarding stop to the destination
+    start_time = column("start_time")  # When the passenger boards the bus
+    completion_time = column("completion_time")  # When the passenger completes journey
+    wait_time = column("wait_time")  # Time spent waiting at the bus stop, fixed on boarding
+    service_time = column("service_time")  # Time spent on the bus
+    stop_index = column("stop_index")  # Which bus stop they're at
+    destination_stop = column("destination_stop")  # Which bus stop they get off at
+    priority = column("priority")  # Priority class, 0 first
+
+    def __init__(self, store, index):
+        self.store = store
+        self.index = index
+
+    @property
+    def id(self):
+        return self.index + 1
+
+    @property
+    def state(self):
+        """waiting, onboard or completed"""
+        return STATES[self.store.state[self.index]]
+
+    @state.setter
+    def state(self, value):
+        self.store.state[self.index] = STATE_CODES[value]
+
+    @property
+    def color(self):
+        return PASSENGER_COLORS[self.store.color[self.index]]
+
+    @property
+    def turnaround_time(self):
+        """Total time from arrival to completion"""
+        if self.completion_time == -1:
+            return 0
+        return self.completion_time - self.arrival_time
+
+    @property
+    def ride_time(self):
+        """Time actually spent on the bus, from boarding to getting off at the destination (-1 until then)"""
+        if self.completion_time == -1:
+            return -1
+        return self.completion_time - self.start_time
+
+    @property
+    def progress(self):
+        """Visual progress indicator (0-100%)"""
+        return 100 * min(1, self.service_time / self.planned_ride_time)
+
+    def update(self, current_time, delta_time):
+        if self.state == "onboard":
+            # Update service time while on bus
+            self.service_time = current_time - self.start_time
+
+    def board(self, current_time):
+        """Get on the bus, fixing the wait and start times"""
+        self.state = "onboard"
+        self.start_time = current_time
+        self.wait_time = current_time - self.arrival_time
+
+    def complete(self, current_time):
+        """Get off at the destination, fixing the completion and service times"""
+        self.state = "completed"
+        self.completion_time = current_time
+        self.service_time = current_time - self.start_time
+
+
+class Bus:
+    # Attributes saved in a checkpoint, besides the passengers on board
+    state_fields = ("route_position", "current_stop", "x", "target_x", "state", "ticks_left", "idle_time", "busy_time",
+                    "total_passengers_served")
+
+    def __init__(self, config=None, bus_id=0, route=None, route_position=0):
+        self.config = config if config is not None else SimulationConfig()
+        self.id = bus_id
+        self.route = route if route is not None else self.config.routes[0]  # Stop indices the bus loops over
+        self.route_stops = set(self.route)
+        self.route_positions = {stop: position for position, stop in enumerate(self.route)}
+        self.route_position = route_position  # Index into route of the stop it is heading to
+        self.x = 0
+        self.passengers = []
+        self.current_stop = self.route[route_position]
+        self.target_x = self.config.bus_stops[self.current_stop]
+        self.state = "moving"  # moving, loading, unloading
+        self.ticks_left = ticks_for(self.travel_time())  # Ticks until the bus reaches its stop, or leaves it while loading
+        self.idle_time = 0
+        self.busy_time = 0
+        self.total_passengers_served = 0
+
+    def travel_time(self):
+        """Seconds the bus needs to get within ARRIVAL_TOLERANCE of its target stop"""
+        return max(0, abs(self.target_x - self.x) - ARRIVAL_TOLERANCE) / self.config.bus_speed
+
+    def head_to_next_stop(self):
+        self.route_position = (self.route_position + 1) % len(self.route)
+        self.current_stop = self.route[self.route_position]
+        self.target_x = self.config.bus_stops[self.current_stop]
+        self.state = "moving"
+        self.ticks_left = ticks_for(self.travel_time())
+
+    def arrive(self):
+        """Pull in at the stop the bus was heading for and start the dwell there"""
+        self.x = self.target_x
+        self.state = "loading"
+        self.ticks_left = ticks_for(self.config.bus_stop_time)
+
+    def drive(self, delta_time):
+        """Carry the bus `delta_time` seconds along the road towards its stop"""
+        dx = self.target_x - self.x
+        direction = 1 if dx > 0 else -1
+        self.x += direction * min(abs(dx), self.config.bus_speed * delta_time)
+        self.busy_time += delta_time
+
+    def unload(self):
+        """Drop off the passengers whose destination is the current stop, returning them"""
+        alighted = [passenger for passenger in self.passengers if passenger.destination_stop == self.current_stop]
+        if alighted:
+            self.passengers = [passenger for passenger in self.passengers
+                               if passenger.destination_stop != self.current_stop]
+            self.total_passengers_served += len(alighted)
+        return alighted
+
+    def board_from(self, queue):
+        """Take passengers this bus can carry from a stop queue in the queue's policy order, returning them"""
+        boarded = []
+        while len(self.passengers) < self.config.bus_capacity:
+            passenger = queue.pop_for(self)
+            if passenger is None:
+                break
+            self.passengers.append(passenger)
+            boarded.append(passenger)
+        return boarded
+
+    def update(self, delta_time):
+        """Advance the bus by one tick, returning True on the tick it reaches its stop or its dwell there ends"""
+        self.ticks_left -= 1
+        if self.state == "moving":
+            self.drive(delta_time)
+        return self.ticks_left == 0
+
+
+class Simulation:
+    """Fixed-step simulation of a fleet of buses looping over their routes"""
+    passenger_class = Passenger
+    bus_class = Bus
+    batch_update = True  # Update passengers column-wise instead of calling Passenger.update on each
+
+    def __init__(self, config=None, seed=None, history_path=None, trace_path=None, checkpoint_path=None,
+                 checkpoint_interval=None):
+        self.config = config if config is not None else SimulationConfig()
+        self.seed = seed  # Seed of the random streams, None for a fresh draw on every reset
+        self.history_path = history_path  # CSV file receiving every completed passenger, if any
+        self.trace_path = trace_path  # Event trace file (.csv, .npy or .parquet), if any
+        self.checkpoint_path = checkpoint_path  # Where save_checkpoint() writes by default
+        self.checkpoint_interval = checkpoint_interval  # Simulated seconds between automatic checkpoints, if any
+        self.completed_passengers = None
+        self.trace = None
+        self.reset()
+
+    def reset(self):
+        stop_count = len(self.config.bus_stops)
+        self.buses = self.create_fleet()
+        self.boarding_policy = POLICIES[self.config.boarding_policy]()
+        self.stop_queues = [StopQueue(self.boarding_policy) for _ in range(stop_count)]  # Waiting passengers per stop
+        self.approaches = ApproachIndex(stop_count)  # Which buses are heading to / loading at each stop
+        for bus in self.buses:
+            self.approaches.approach(bus, bus.current_stop, bus.ticks_left * TIME_STEP)
+
+        # Ride times between stops, and the stops reachable from each without leaving a route that calls there
+        self.route_model = RouteModel(self.config.bus_stops, self.config.routes, self.config.bus_speed,
+                                      self.config.bus_stop_time, ARRIVAL_TOLERANCE)
+        self.destinations = self.route_model.destinations
+        self.origins = [stop_idx for stop_idx, reachable in enumerate(self.destinations) if reachable]
+
+        self.close()
+        self.completed_passengers = CompletionLog(path=self.history_path)  # Recent completions plus the on-disk history
+        self.stats = PassengerStats()  # Running statistics, updated as passengers arrive and complete
+        self.passenger_counter = 1
+        self.tick = 0  # Ticks stepped so far
+        self.time = 0  # Simulation time in seconds, tick * TIME_STEP
+        self.auto_generate = True
+        self.simulation_ended = False  # Flag to track if simulation has reached time limit
+        self.store = PassengerStore()  # Columnar record of every passenger ever generated
+        self.total_passengers_generated = 0  # Counter for total passengers generated
+        self.rng = RandomStreams(self.seed)  # Independent random stream per subsystem
+
+        # Every arrival up to the cutoff, drawn up front and released as the clock passes it. Drawn to the cutoff
+        # even when the time limit comes first, so raising the limit of a forked run only lets more of it through
+        self.arrival_times = deque(arrival_schedule(self.arrival_rate(), 0, self.config.passenger_generation_cutoff,
+                                                    self.rng.arrivals))
+
+        # Every bus starts the run by leaving the depot at x = 0
+        self.trace = open_trace(self.trace_path, config=self.trace_config()) if self.trace_path is not None else None
+        for bus in self.buses:
+            self.record_event("bus_departure", bus=bus, destination_stop=bus.current_stop)
+        self.next_checkpoint = self.checkpoint_interval  # Time of the next automatic checkpoint, if any
+
+    @classmethod
+    def from_checkpoint(cls, path, config=None, **kwargs):
+        """Resume the run saved at `path`, under its own configuration unless another is given"""
+        state = read_checkpoint(path)
+        history_path = kwargs.pop("history_path", None)
+        trace_path = kwargs.pop("trace_path", None)
+        simulation = cls(config if config is not None else state["config"], seed=state["seed"], **kwargs)
+        # Given only now, so reset() doesn't overwrite files the restored run carries on
+        simulation.history_path = history_path
+        simulation.trace_path = trace_path
+        simulation.set_state(state)
+        return simulation
+
+    def get_state(self):
+        """Everything needed to carry on the run, as plain data with passengers referred to by row index"""
+        approaches = self.approaches
+        return {
+            "config": self.config,
+            "seed": self.rng.seed,
+            "time": self.time,
+            "passenger_counter": self.passenger_counter,
+            "total_passengers_generated": self.total_passengers_generated,
+            "auto_generate": self.auto_generate,
+            "simulation_ended": self.simulation_ended,
+            "store": {name: getattr(self.store, name).tobytes() for name in COLUMNS},
+            "stop_queues": [([passenger.index for passenger in queue], queue.boarded) for queue in self.stop_queues],
+            "buses": [(tuple(getattr(bus, name) for name in bus.state_fields),
+                       [passenger.index for passenger in bus.passengers]) for bus in self.buses],
+            "approaches": ([list(approaching) for approaching in approaches.approaching],
+                           [[bus.id for bus in loading] for loading in approaches.loading],
+                           dict(approaches.entries)),
+            "stats": copy.deepcopy(self.stats),
+            "recent": ([passenger.index for passenger in self.completed_passengers.recent],
+                       self.completed_passengers.total),
+            "rng": {name: getattr(self.rng, name).getstate() for name in STREAMS},
+            "arrival_times": list(self.arrival_times),
+            # Files being written and how much of them the state accounts for
+            "history": (self.history_path, self.completed_passengers.written) if self.history_path is not None else None,
+            "trace": (self.trace_path, self.trace.count) if self.trace is not None else None,
+        }
+
+    def set_state(self, state):
+        """Carry on from a state returned by get_state(), in place of the current run
+
+        A history or trace file the state was taken alongside is cut back to
+        what had been written by then and appended to, so resuming a crashed
+        run or restoring an earlier checkpoint leaves one file covering the
+        whole run. Any other file starts afresh from the restored time, as
+        after reset().
+        """
+        if len(state["buses"]) != len(self.buses):
+            raise ValueError(f"state has {len(state['buses'])} buses but the fleet has {len(self.buses)}")
+
+        self.close()
+        self.completed_passengers = CompletionLog(path=self.history_path,
+                                                  resume_at=self.resume_point(self.history_path, state.get("history")))
+        if self.trace_path is not None:
+            self.trace = open_trace(self.trace_path, self.resume_point(self.trace_path, state.get("trace")),
+                                    self.trace_config())
+        for name in ("time", "passenger_counter", "total_passengers_generated", "auto_generate", "simulation_ended"):
+            setattr(self, name, state[name])
+        self.tick = tick_at(self.time)
+
+        self.store = PassengerStore()
+        for name, data in state["store"].items():
+            getattr(self.store, name).frombytes(data)
+
+        # One view per passenger, shared wherever the passenger appears
+        views = {}
+
+        def passenger(index):
+            if index not in views:
+                views[index] = self.passenger_class(self.store, index)
+            return views[index]
+
+        # Under another bus speed or stop time, those still waiting are given the plan they would get now
+        replan = self.retimes(state["config"])
+        self.stop_queues = []
+        for waiting, boarded in state["stop_queues"]:
+            queue = StopQueue(self.boarding_policy)
+            for index in waiting:
+                view = passenger(index)
+                if replan:
+                    view.planned_ride_time = self.route_model.ride_time(view.stop_index, view.destination_stop)
+                queue.append(view)
+            queue.boarded = boarded
+            self.stop_queues.append(queue)
+
+        for bus, (values, riders) in zip(self.buses, state["buses"]):
+            for name, value in zip(bus.state_fields, values):
+                setattr(bus, name, value)
+            bus.passengers = [passenger(index) for index in riders]
+
+        approaching, loading, entries = state["approaches"]
+        self.approaches = ApproachIndex(len(self.stop_queues))
+        self.approaches.approaching = [list(stop_approaching) for stop_approaching in approaching]
+        self.approaches.loading = [[self.buses[bus_id] for bus_id in stop_loading] for stop_loading in loading]
+        self.approaches.entries = dict(entries)
+
+        self.stats = copy.deepcopy(state["stats"])
+        recent, total = state["recent"]
+        self.completed_passengers.recent.extend(passenger(index) for index in recent)
+        self.completed_passengers.total = total
+
+        self.rng = RandomStreams(state["seed"])
+        for name, stream_state in state["rng"].items():
+            getattr(self.rng, name).setstate(stream_state)
+        self.arrival_times = deque(state["arrival_times"])
+
+        if self.checkpoint_interval:
+            self.next_checkpoint = (self.time // self.checkpoint_interval + 1) * self.checkpoint_interval
+        if self.retimes(state["config"]):
+            self.retime_buses(state["config"])
+
+    def retimes(self, previous):
+        """Whether buses part way through a leg or a dwell under config `previous` need retiming for this one"""
+        return (previous.bus_speed, previous.bus_stop_time) != (self.config.bus_speed, self.config.bus_stop_time)
+
+    def retime_buses(self, previous):
+        """Carry on the current legs and dwells at this config's bus speed and stop time instead of `previous`'s"""
+        for bus in self.buses:
+            if bus.state == "loading":
+                added = ticks_for(self.config.bus_stop_time) - ticks_for(previous.bus_stop_time)
+                bus.ticks_left = max(1, bus.ticks_left + added)
+            else:
+                # What is left of the leg, driven at the new speed
+                bus.ticks_left = ticks_for(bus.ticks_left * TIME_STEP * previous.bus_speed / self.config.bus_speed)
+                self.approaches.retime(bus, self.bus_eta(bus))
+
+    def bus_eta(self, bus):
+        """When a moving bus will reach its stop"""
+        return (self.tick + bus.ticks_left) * TIME_STEP
+
+    @staticmethod
+    def resume_point(path, recorded):
+        """Rows of the file at `path` to keep when carrying on from a state that `recorded` (path, rows), else None"""
+        if path is None or recorded is None or not os.path.exists(path):
+            return None
+        recorded_path, rows = recorded
+        return rows if os.path.abspath(recorded_path) == os.path.abspath(path) else None
+
+    def set_boarding_policy(self, name):
+        """Switch every stop to another fleet.POLICIES entry, re-ordering the passengers already waiting"""
+        self.config = dataclasses.replace(self.config, boarding_policy=name)
+        self.boarding_policy = POLICIES[name]()
+        for queue in self.stop_queues:
+            queue.set_policy(self.boarding_policy)
+
+    def checkpoint_file(self, path):
+        """`path`, or checkpoint_path when it is None"""
+        if path is None:
+            path = self.checkpoint_path
+        if path is None:
+            raise ValueError("No checkpoint file: pass a path or set checkpoint_path")
+        return path
+
+    def save_checkpoint(self, path=None):
+        """Write the current state to `path`, or to checkpoint_path"""
+        path = self.checkpoint_file(path)
+        # Get everything the state accounts for onto disk, so a resumed run can carry the files on
+        self.completed_passengers.flush()
+        if self.trace is not None:
+            self.trace.flush()
+        write_checkpoint(path, self.get_state())
+
+    def restore_checkpoint(self, path=None):
+        """Return to the state saved at `path`, or at checkpoint_path"""
+        self.set_state(read_checkpoint(self.checkpoint_file(path)))
+
+    def checkpoint_if_due(self):
+        """Save the periodic checkpoint once the clock passes its time"""
+        if self.next_checkpoint is not None and self.time >= self.next_checkpoint:
+            self.save_checkpoint()
+            self.next_checkpoint = (self.time // self.checkpoint_interval + 1) * self.checkpoint_interval
+
+    def close(self):
+        """Flush and close the history and trace files of the current run"""
+        if self.completed_passengers is not None:
+            self.completed_passengers.close()
+        if self.trace is not None:
+            self.record_event("run_end")  # So a replay knows how long the run went on after its last event
+            self.trace.close()
+            self.trace = None
+
+    def record_event(self, kind, passenger=None, bus=None, stop_index=-1, destination_stop=-1):
+        """Write an event at the current time to the trace, if one is being recorded"""
+        if self.trace is not None:
+            self.trace.record(self.time, kind, passenger, bus, stop_index, destination_stop)
+
+    def trace_config(self):
+        """The configuration as plain data saved with a trace, leaving out the arrival rate curve"""
+        return {name: value for name, value in dataclasses.asdict(self.config).items() if name != "arrival_rate"}
+
+    def create_fleet(self):
+        """Build the fleet, spreading the buses of each route evenly around its loop"""
+        routes = self.config.routes
+        fleet_size = self.config.fleet_size
+        buses = []
+        for bus_id in range(fleet_size):
+            route_idx = bus_id % len(routes)
+            route = routes[route_idx]
+            sharing = len(range(route_idx, fleet_size, len(routes)))  # Buses on this route
+            rank = bus_id // len(routes)  # This bus's place among them
+            buses.append(self.bus_class(self.config, bus_id, route, rank * len(route) // sharing))
+        return buses
+
+    def arrival_rate(self):
+        """Rate curve of passenger arrivals, in passengers per second"""
+        if self.config.arrival_rate is not None:
+            return self.config.arrival_rate
+        # The per-frame probability the simulation was tuned with, as a per-second rate
+        return DecayingRate(self.config.passenger_generation_rate * FPS, self.config.passenger_generation_cutoff)
+
+    @property
+    def onboard_passengers(self):
+        """Passengers riding any bus of the fleet"""
+        return [passenger for bus in self.buses for passenger in bus.passengers]
+
+    def generate_random_passenger(self):
+        """Generate a random passenger with sensible parameters"""
+        stop_index = self.rng.arrivals.choice(self.origins)
+        color = self.rng.cosmetics.randrange(len(PASSENGER_COLORS))  # Random color for the passenger
+        priority = self.rng.priorities.randrange(self.config.priority_classes) if self.config.priority_classes > 1 else 0
+
+        # Assign a random destination stop that's different from the starting stop
+        destination_stop = self.rng.destinations.choice(self.destinations[stop_index])
+        planned_ride_time = self.route_model.ride_time(stop_index, destination_stop)
+
+        index = self.store.add(self.time, planned_ride_time, stop_index, destination_stop, color, priority)
+        passenger = self.passenger_class(self.store, index)
+        self.passenger_counter += 1
+        self.total_passengers_generated += 1  # Increment total passenger counter
+        return passenger
+
+    @property
+    def waiting_passengers(self):
+        """Passengers still waiting at any stop, in per-stop arrival order"""
+        return [passenger for queue in self.stop_queues for passenger in queue]
+
+    def add_passenger(self, passenger):
+        """Put a new passenger in the waiting line at their stop"""
+        self.stop_queues[passenger.stop_index].append(passenger)
+        self.stats.arrive()
+        self.record_event("arrival", passenger, stop_index=passenger.stop_index)
+
+        # Buses already loading at this stop take the passenger straight away while they have room
+        for bus in self.approaches.loading[passenger.stop_index]:
+            self.load_passengers(bus)
+
+    def load_passengers(self, bus):
+        """Board waiting passengers at the bus's stop in boarding policy order while there's room"""
+        for passenger in bus.board_from(self.stop_queues[bus.current_stop]):
+            passenger.board(self.time)
+            self.record_event("boarding", passenger, bus, bus.current_stop)
+
+    def bus_arrived(self, bus):
+        """Pull a bus into its stop, dropping off the riders who got there and boarding whoever it can take"""
+        bus.arrive()
+        self.approaches.arrive(bus, bus.current_stop)
+        self.record_event("bus_arrival", bus=bus, stop_index=bus.current_stop)
+
+        for passenger in bus.unload():
+            passenger.complete(self.time)
+            self.record_completion(passenger, bus, bus.current_stop)
+        self.load_passengers(bus)
+
+    def bus_leaving(self, bus):
+        """Send a bus whose dwell is over on to the next stop of its route"""
+        self.approaches.leave(bus, bus.current_stop)
+        leaving = bus.current_stop
+        bus.head_to_next_stop()
+        self.record_event("bus_departure", bus=bus, stop_index=leaving, destination_stop=bus.current_stop)
+        self.approaches.approach(bus, bus.current_stop, self.bus_eta(bus))
+
+    def record_completion(self, passenger, bus=None, stop_index=-1):
+        """Add a passenger who left `bus` at `stop_index` to the completed list and statistics"""
+        self.completed_passengers.append(passenger)
+        self.stats.complete(passenger)
+        self.record_event("alighting", passenger, bus, stop_index)
+
+    def state_counts(self):
+        """Number of passengers waiting, on board and completed"""
+        return self.stats.state_counts(sum(queue.boarded for queue in self.stop_queues))
+
+    def step(self):
+        """Advance the simulation by one tick, returning False once the time limit is hit"""
+        # Check if simulation time limit has been reached
+        if self.tick >= tick_at(self.config.max_simulation_time):
+            self.simulation_ended = True
+            return False
+
+        # Update simulation time from the tick count, so rounding doesn't build up over a long run
+        time_delta = TIME_STEP
+        self.tick += 1
+        self.time = self.tick * TIME_STEP
+
+        # Release the scheduled arrivals this tick has reached, before the buses so those loading take them
+        arrival_times = self.arrival_times
+        while arrival_times and tick_at(arrival_times[0]) <= self.tick:
+            arrival_times.popleft()
+            if self.auto_generate:
+                self.add_passenger(self.generate_random_passenger())
+
+        # Update buses in fleet order, handling those reaching their stop or ending their dwell this tick
+        for bus in self.buses:
+            if bus.update(time_delta):
+                if bus.state == "moving":
+                    self.bus_arrived(bus)
+                else:
+                    self.bus_leaving(bus)
+
+        # Update the passengers on board; those waiting have nothing to refresh until a bus takes them
+        if self.batch_update:
+            update_onboard(self.store, [passenger.index for passenger in self.onboard_passengers], self.time)
+        else:
+            for passenger in self.onboard_passengers:
+                passenger.update(self.time, time_delta)
+
+        self.checkpoint_if_due()
+        return True
+
+    def run_until(self, end_time):
+        """Step until the clock reaches `end_time` or the time limit"""
+        end_tick = tick_at(end_time)
+        while self.tick < end_tick and self.step():
+            pass
+
+    def run_headless(self, duration=None):
+        """Step the simulation without any display until `duration` simulated seconds pass"""
+        if duration is None:
+            duration = self.config.max_simulation_time
+        self.run_until(duration)
+        return self.summary()
+
+    def bus_utilization(self):
+        """Percentage of elapsed time the buses spent driving, averaged over the fleet"""
+        total_time = max(1, self.time) * len(self.buses)
+        return (sum(bus.busy_time for bus in self.buses) / total_time) * 100
+
+    def summary(self):
+        """Aggregate statistics over the passengers completed so far"""
+        metrics = self.stats.metrics
+        counts = self.state_counts()
+        return {
+            "total_passengers": self.total_passengers_generated,
+            "waiting": counts["waiting"],
+            "onboard": counts["onboard"],
+            "completed": counts["completed"],
+            "avg_wait_time": metrics["wait_time"].mean,
+            "avg_response_time": metrics["response_time"].mean,
+            "avg_ride_time": metrics["ride_time"].mean,
+            "avg_turnaround_time": metrics["turnaround_time"].mean,
+            "stdev_wait_time": metrics["wait_time"].stdev,
+            "stdev_response_time": metrics["response_time"].stdev,
+            "stdev_ride_time": metrics["ride_time"].stdev,
+            "stdev_turnaround_time": metrics["turnaround_time"].stdev,
+            "throughput": counts["completed"] / max(1, self.time),  # Passengers per second
+            "bus_utilization": self.bus_utilization(),
+            "passengers_served": sum(bus.total_passengers_served for bus in self.buses),
+            **self.stats.percentiles(),
+        }
+
+
+def run_from_command_line(simulation_class):
+    """Run one headless scenario with the given engine and print the statistics"""
+    parser = argparse.ArgumentParser(description="Run the bus simulation without a display")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--duration", type=float, default=None)
+    parser.add_argument("--trace", default=None, metavar="PATH",
+                        help="record every event to a .csv, .npy or .parquet trace")
+    parser.add_argument("--history", default=None, metavar="PATH",
+                        help="write every completed passenger to a CSV file")
+    parser.add_argument("--checkpoint", default=None, metavar="PATH", help="where to save periodic checkpoints")
+    parser.add_argument("--checkpoint-interval", type=float, default=None, metavar="SECONDS",
+                        help="simulated seconds between checkpoints")
+    parser.add_argument("--resume", default=None, metavar="PATH", help="carry on from a saved checkpoint")
+    args = parser.parse_args()
+    if args.checkpoint_interval is not None and args.checkpoint is None:
+        parser.error("--checkpoint-interval needs --checkpoint")
+
+    options = {"trace_path": args.trace, "history_path": args.history, "checkpoint_path": args.checkpoint,
+               "checkpoint_interval": args.checkpoint_interval}
+    if args.resume is not None:
+        simulation = simulation_class.from_checkpoint(args.resume, **options)
+    else:
+        simulation = simulation_class(seed=args.seed, **options)
+    summary = simulation.run_headless(args.duration)
+    simulation.close()
+    for name, value in summary.items():
+        print(f"{name}: {value:.2f}" if isinstance(value, float) else f"{name}: {value}")
+
+
+def main():
+    # Run one scenario without a display and print the statistics
+    run_from_command_line(Simulation)
+
+
+# Only run the main function if this script is executed directly
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""Streaming statistics over the passengers of a run.
+
+Each completed passenger is folded into running accumulators once, when
+it finishes, so the summary and the stats panel read their averages,
+spreads, extremes and percentiles without re-scanning every completed
+passenger each frame. Percentiles come from a log-bucketed histogram
+whose size depends on the range of values, not on how many there are.
+Whole arrays of values can also be folded in at once, which is how a
+replayed trace rebuilds the statistics at a seek point.
+"""
+import math
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Per-passenger quantities tracked over completed passengers
+METRICS = ("wait_time", "response_time", "ride_time", "turnaround_time")
+
+# Metrics with tracked percentiles, and the percentiles reported for them
+QUANTILE_METRICS = ("wait_time", "response_time", "turnaround_time")
+PERCENTILES = (50, 90, 99)
+
+
+class RunningStats:
+    """Mean, variance, minimum and maximum of a stream of values (Welford's method)"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0  # Sum of squared deviations from the running mean
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def add_batch(self, values):
+        """Fold in a whole sequence of values at once (Chan et al.'s pairwise update)"""
+        if np is None:
+            for value in values:
+                self.add(value)
+            return
+        values = np.asarray(values, dtype=float)
+        if not len(values):
+            return
+        count = self.count + len(values)
+        mean = float(values.mean())
+        delta = mean - self.mean
+        self.m2 += float(((values - mean) ** 2).sum()) + delta * delta * self.count * len(values) / count
+        self.mean += delta * len(values) / count
+        self.count = count
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+    @property
+    def variance(self):
+        """Sample variance, 0 until there are two values"""
+        if self.count < 2:
+            return 0.0
+        return self.m2 / (self.count - 1)
+
+    @property
+    def stdev(self):
+        return math.sqrt(self.variance)
+
+
+class LogHistogram:
+    """Bounded-memory quantile sketch in the style of an HDR histogram
+
+    Values are counted in buckets whose width grows geometrically by
+    `precision`, so any quantile is reported within that relative error
+    (values up to `resolution` share the first bucket). Memory is one
+    counter per bucket up to the largest value seen, a few hundred for
+    the times of a run.
+    """
+
+    def __init__(self, precision=0.01, resolution=0.01):
+        self.resolution = resolution
+        self.log_base = math.log1p(precision)
+        self.counts = []  # Count per bucket index
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def bucket(self, value):
+        if value <= self.resolution:
+            return 0
+        return 1 + int(math.log(value / self.resolution) / self.log_base)
+
+    def add(self, value):
+        index = self.bucket(value)
+        if index >= len(self.counts):
+            self.counts.extend([0] * (index + 1 - len(self.counts)))
+        self.counts[index] += 1
+        self.count += 1
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def add_batch(self, values):
+        """Count a whole sequence of values at once"""
+        if np is None:
+            for value in values:
+                self.add(value)
+            return
+        values = np.asarray(values, dtype=float)
+        if not len(values):
+            return
+        scaled = np.maximum(values, self.resolution) / self.resolution
+        indices = np.where(values <= self.resolution, 0, 1 + (np.log(scaled) / self.log_base).astype(int))
+        bucket_counts = np.bincount(indices)
+        if len(bucket_counts) > len(self.counts):
+            self.counts.extend([0] * (len(bucket_counts) - len(self.counts)))
+        for index in np.flatnonzero(bucket_counts):
+            self.counts[index] += int(bucket_counts[index])
+        self.count += len(values)
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+    def quantile(self, q):
+        """Value below which a fraction `q` of the values fall, 0 while empty"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank and bucket_count:
+                break
+        if index == 0:
+            value = self.resolution / 2
+        else:
+            # Geometric middle of the bucket
+            value = self.resolution * math.exp((index - 0.5) * self.log_base)
+        return min(max(value, self.min), self.max)
+
+    def percentile(self, p):
+        return self.quantile(p / 100)
+
+
+class PassengerStats:
+    """Running statistics of completed passengers plus arrival and completion counts"""
+
+    def __init__(self):
+        self.metrics = {name: RunningStats() for name in METRICS}
+        self.histograms = {name: LogHistogram() for name in QUANTILE_METRICS}
+        self.arrived = 0  # Passengers put in a stop queue
+        self.completed = 0  # Passengers who finished their ride
+
+    def arrive(self):
+        self.arrived += 1
+
+    def complete(self, passenger):
+        """Fold a passenger who just finished their ride into the statistics"""
+        self.completed += 1
+        values = {
+            "wait_time": passenger.wait_time,
+            "response_time": max(0, passenger.start_time - passenger.arrival_time),
+            "ride_time": passenger.ride_time,
+            "turnaround_time": passenger.turnaround_time,
+        }
+        for name, value in values.items():
+            self.metrics[name].add(value)
+        for name, histogram in self.histograms.items():
+            histogram.add(values[name])
+
+    def complete_batch(self, values):
+        """Fold in many completed passengers at once, given each metric's values as parallel arrays"""
+        self.completed += len(values["wait_time"])
+        for name, stats in self.metrics.items():
+            stats.add_batch(values[name])
+        for name, histogram in self.histograms.items():
+            histogram.add_batch(values[name])
+
+    def percentiles(self):
+        """PERCENTILES of each QUANTILE_METRICS entry, keyed like p90_wait_time"""
+        return {f"p{p}_{name}": histogram.percentile(p)
+                for name, histogram in self.histograms.items() for p in PERCENTILES}
+
+    def state_counts(self, boarded):
+        """Passengers in each state, given how many have boarded so far"""
+        return {
+            "waiting": self.arrived - boarded,
+            "onboard": boarded - self.completed,
+            "completed": self.completed,
+        }
@@ -0,0 +1,37 @@
+import pytest
+
+from arrivals import DecayingRate, RushHourRate, arrival_schedule, np
+from rng import RandomStreams
+
+RATES = {
+    "decaying": DecayingRate(0.6, 25),
+    "rush_hour": RushHourRate(0.2, [(60, 10, 1.5), (150, 20, 0.8)]),
+}
+
+
+def schedule(rate, seed, end=200):
+    return arrival_schedule(rate, 0, end, RandomStreams(seed).arrivals)
+
+
+@pytest.mark.skipif(np is None, reason="NumPy not installed")
+@pytest.mark.parametrize("name", sorted(RATES))
+@pytest.mark.parametrize("seed", [0, 1, 42])
+def test_schedule_identical_with_and_without_numpy(monkeypatch, name, seed):
+    with_numpy = schedule(RATES[name], seed)
+    monkeypatch.setattr("arrivals.np", None)
+    assert schedule(RATES[name], seed) == with_numpy
+
+
+@pytest.mark.parametrize("name", sorted(RATES))
+def test_schedule_is_sorted_and_within_bounds(name):
+    times = schedule(RATES[name], 3)
+    assert times == sorted(times)
+    assert all(0 <= time < 200 for time in times)
+
+
+def test_decaying_rate_stops_at_the_cutoff():
+    assert all(time < 25 for time in schedule(RATES["decaying"], 5))
+
+
+def test_no_arrivals_at_zero_rate():
+    assert schedule(DecayingRate(0.0, 25), 1) == []
@@ -0,0 +1,22 @@
+import pytest
+
+from batch import run_forked, run_sweep
+
+# Configurations that only differ after the warm-up, so branching off a shared one changes nothing
+CONFIGURATIONS = [{"max_simulation_time": 20}, {"max_simulation_time": 40}]
+PARAMS = {"max_simulation_time": 20, "passenger_generation_cutoff": 35}
+
+
+@pytest.mark.parametrize("engine", ["fixed", "event"])
+def test_forked_rows_match_sweep_rows(engine):
+    params = dict(PARAMS, engine=engine)
+    swept = run_sweep(CONFIGURATIONS, 2, params=params, workers=1)
+    forked = run_forked(CONFIGURATIONS, 10, 2, params=params, workers=1)
+
+    assert forked == swept
+    assert swept[0]["completed"] < swept[2]["completed"]  # The longer limit lets later arrivals through
+
+
+def test_forking_refuses_to_vary_the_warm_up():
+    with pytest.raises(ValueError):
+        run_forked([{"fleet_size": 1}, {"fleet_size": 2}], 10, params=PARAMS, workers=1)
@@ -0,0 +1,88 @@
+import pytest
+
+from checkpoint import read_checkpoint, write_checkpoint
+from events import EventSimulation
+from simulation import Simulation, SimulationConfig
+
+ENGINES = [Simulation, EventSimulation]
+CONFIG = SimulationConfig(fleet_size=3, routes=[[0, 1, 2, 3, 4], [4, 2, 0]], max_simulation_time=120,
+                          passenger_generation_cutoff=100, passenger_generation_rate=0.05)
+
+
+def uninterrupted(engine, **kwargs):
+    simulation = engine(CONFIG, seed=5, **kwargs)
+    summary = simulation.run_headless()
+    simulation.close()
+    return summary
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_resumed_run_matches_uninterrupted(engine, tmp_path):
+    path = tmp_path / "run.ckpt"
+    simulation = engine(CONFIG, seed=5)
+    simulation.run_until(47.3)
+    simulation.save_checkpoint(path)
+
+    assert engine.from_checkpoint(path).run_headless() == uninterrupted(engine)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_restoring_an_earlier_checkpoint_rewinds(engine, tmp_path):
+    simulation = engine(CONFIG, seed=5, checkpoint_path=tmp_path / "run.ckpt")
+    simulation.run_until(30)
+    simulation.save_checkpoint()
+    simulation.run_until(90)
+    simulation.restore_checkpoint()
+
+    assert simulation.run_headless() == uninterrupted(engine)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("extension", [".npy", ".csv"])
+def test_resume_after_a_crash_carries_the_files_on(engine, extension, tmp_path):
+    pytest.importorskip("numpy")
+    reference = {"trace_path": str(tmp_path / f"reference{extension}"), "history_path": str(tmp_path / "reference_history.csv")}
+    files = {"trace_path": str(tmp_path / f"run{extension}"), "history_path": str(tmp_path / "run_history.csv")}
+    uninterrupted(engine, **reference)
+
+    simulation = engine(CONFIG, seed=5, checkpoint_path=str(tmp_path / "run.ckpt"), checkpoint_interval=25, **files)
+    simulation.run_until(80)
+    # Crash after writing past the last checkpoint, without closing anything
+    simulation.trace.flush()
+    simulation.completed_passengers.flush()
+    simulation.trace.file.close()
+    simulation.completed_passengers.file.close()
+
+    resumed = engine.from_checkpoint(tmp_path / "run.ckpt", **files)
+    resumed.run_headless()
+    resumed.close()
+
+    for name in files:
+        with open(files[name], "rb") as run, open(reference[name], "rb") as expected:
+            assert run.read() == expected.read()
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_state_round_trips_through_a_file(engine, tmp_path):
+    simulation = engine(CONFIG, seed=5)
+    simulation.run_until(60)
+    write_checkpoint(tmp_path / "run.ckpt", simulation.get_state())
+
+    restored = engine(CONFIG, seed=0)
+    restored.set_state(read_checkpoint(tmp_path / "run.ckpt"))
+    assert restored.summary() == simulation.summary()
+    assert restored.run_headless() == simulation.run_headless()
+
+
+def test_saving_without_a_path_is_refused(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with pytest.raises(ValueError):
+        Simulation(CONFIG, seed=1).save_checkpoint()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_reading_something_else_is_refused(tmp_path):
+    path = tmp_path / "not.ckpt"
+    path.write_bytes(b"definitely not a checkpoint")
+    with pytest.raises(ValueError):
+        read_checkpoint(path)
@@ -0,0 +1,25 @@
+import pytest
+
+from events import EventSimulation
+from simulation import Simulation, SimulationConfig
+
+CONFIGS = {
+    "single_bus": SimulationConfig(),
+    "shared_stops": SimulationConfig(fleet_size=3, routes=[[0, 1, 2, 3, 4], [4, 2, 0]], max_simulation_time=120,
+                                     passenger_generation_cutoff=100, passenger_generation_rate=0.05),
+    "crowded": SimulationConfig(fleet_size=2, bus_capacity=3, max_simulation_time=90, passenger_generation_cutoff=80,
+                                passenger_generation_rate=0.08, boarding_policy="shortest_ride"),
+}
+COLUMNS = ("arrival_time", "start_time", "completion_time", "stop_index", "destination_stop")
+
+
+@pytest.mark.parametrize("name", sorted(CONFIGS))
+@pytest.mark.parametrize("seed", [1, 7])
+def test_engines_give_every_passenger_the_same_times(name, seed):
+    fixed, event = Simulation(CONFIGS[name], seed=seed), EventSimulation(CONFIGS[name], seed=seed)
+    fixed_summary, event_summary = fixed.run_headless(), event.run_headless()
+
+    assert fixed.time == event.time == CONFIGS[name].max_simulation_time
+    for column in COLUMNS:
+        assert list(getattr(fixed.store, column)) == list(getattr(event.store, column)), column
+    assert fixed_summary == pytest.approx(event_summary)
@@ -0,0 +1,50 @@
+import csv
+
+import pytest
+
+from event_trace import EVENT_KINDS, FIELD_NAMES
+from simulation import Simulation, SimulationConfig
+
+np = pytest.importorskip("numpy")
+
+CONFIG = SimulationConfig(fleet_size=2, max_simulation_time=60, passenger_generation_cutoff=50,
+                          passenger_generation_rate=0.05)
+
+
+def read_csv_trace(path):
+    with open(path, newline="") as file:
+        reader = csv.reader(file)
+        assert next(reader) == FIELD_NAMES
+        return list(reader)
+
+
+def test_csv_and_npy_traces_read_back_the_same(tmp_path):
+    csv_path, npy_path = str(tmp_path / "run.csv"), str(tmp_path / "run.npy")
+    for path in (csv_path, npy_path):
+        simulation = Simulation(CONFIG, seed=2, trace_path=path)
+        simulation.run_headless()
+        simulation.close()
+
+    rows = read_csv_trace(csv_path)
+    records = np.load(npy_path, mmap_mode="r")
+    assert len(rows) == len(records) > 0
+    assert [row[1] for row in rows] == [EVENT_KINDS[kind] for kind in records["kind"]]
+    for name in ("time", "arrival_time", "start_time", "completion_time"):
+        column = FIELD_NAMES.index(name)
+        assert [float(row[column]) for row in rows] == records[name].tolist()
+    for name in ("passenger_id", "bus_id", "stop_index", "destination_stop"):
+        column = FIELD_NAMES.index(name)
+        assert [int(row[column]) for row in rows] == records[name].tolist()
+    assert rows[-1][1] == "run_end"
+
+
+def test_npy_trace_loads_after_a_flush_mid_run(tmp_path):
+    path = str(tmp_path / "run.npy")
+    simulation = Simulation(CONFIG, seed=2, trace_path=path)
+    simulation.run_until(30)
+    simulation.trace.flush()
+
+    records = np.load(path)
+    assert records.shape == (simulation.trace.count,)
+    assert records["time"].max() <= 30
+    simulation.close()
@@ -0,0 +1,58 @@
+from fleet import POLICIES, StopQueue
+from passenger_store import PassengerStore
+from simulation import Bus, Passenger, SimulationConfig
+
+CONFIG = SimulationConfig(routes=[[0, 1, 2, 3, 4], [0, 2]])
+# (arrival time, planned ride time, destination, priority) of passengers waiting at stop 0
+WAITING = [(1.0, 9.0, 3, 1), (2.0, 4.0, 1, 0), (3.0, 6.0, 4, 1), (4.0, 4.0, 2, 0), (5.0, 2.0, 1, 1)]
+
+
+def queue_of(policy, passengers=WAITING):
+    store = PassengerStore()
+    queue = StopQueue(POLICIES[policy]())
+    for arrival_time, planned_ride_time, destination, priority in passengers:
+        queue.append(Passenger(store, store.add(arrival_time, planned_ride_time, 0, destination, 0, priority)))
+    return queue
+
+
+def boarding_order(queue, bus):
+    order = []
+    while (passenger := queue.pop_for(bus)) is not None:
+        order.append(passenger.index)
+    return order
+
+
+def test_fcfs_boards_in_arrival_order():
+    assert boarding_order(queue_of("fcfs"), Bus(CONFIG, 0, CONFIG.routes[0])) == [0, 1, 2, 3, 4]
+
+
+def test_shortest_ride_boards_shortest_planned_ride_first_and_ties_by_arrival():
+    assert boarding_order(queue_of("shortest_ride"), Bus(CONFIG, 0, CONFIG.routes[0])) == [4, 1, 3, 2, 0]
+
+
+def test_priority_boards_lower_classes_first_then_by_arrival():
+    assert boarding_order(queue_of("priority"), Bus(CONFIG, 0, CONFIG.routes[0])) == [1, 3, 0, 2, 4]
+
+
+def test_destination_boards_those_getting_off_soonest_on_the_loop():
+    # Loading at stop 0 of the route, so stop 1 comes up first and stop 4 last
+    assert boarding_order(queue_of("destination"), Bus(CONFIG, 0, CONFIG.routes[0])) == [1, 4, 3, 0, 2]
+
+
+def test_bus_only_takes_passengers_for_stops_on_its_route():
+    queue = queue_of("fcfs")
+    assert boarding_order(queue, Bus(CONFIG, 1, CONFIG.routes[1])) == [3]
+    assert len(queue) == 4
+
+
+def test_switching_policy_reorders_those_already_waiting():
+    queue = queue_of("fcfs")
+    bus = Bus(CONFIG, 0, CONFIG.routes[0])
+    assert queue.pop_for(bus).index == 0
+
+    queue.set_policy(POLICIES["shortest_ride"]())
+    store = next(iter(queue)).store
+    queue.append(Passenger(store, store.add(6.0, 3.0, 0, 2, 0, 0)))  # Joins under the new policy
+    assert boarding_order(queue, bus) == [4, 5, 1, 3, 2]
+    assert queue.boarded == 6
+    assert len(queue) == 0
@@ -0,0 +1,51 @@
+import pytest
+
+from passenger_store import NUMPY_MIN_BATCH, PassengerStore, np, update_onboard
+from simulation import Passenger, Simulation, SimulationConfig
+
+
+def onboard_store(count):
+    """Store of `count` passengers riding since different times, plus a waiting one the updates must leave alone"""
+    store = PassengerStore()
+    for i in range(count + 1):
+        store.add(0.1 * i, 4.0, 0, 1, 0, 0)
+    for i in range(count):
+        Passenger(store, i).board(0.5 + 0.25 * i)
+    return store
+
+
+@pytest.mark.parametrize("count", [NUMPY_MIN_BATCH - 1, NUMPY_MIN_BATCH, NUMPY_MIN_BATCH + 1])
+def test_update_onboard_matches_passenger_update(count):
+    batch, scalar = onboard_store(count), onboard_store(count)
+    update_onboard(batch, list(range(count)), 30.0)
+    for i in range(count + 1):
+        Passenger(scalar, i).update(30.0, 1 / 60)
+
+    for name in ("start_time", "wait_time", "service_time", "completion_time"):
+        assert getattr(batch, name) == getattr(scalar, name), name
+
+
+@pytest.mark.skipif(np is None, reason="NumPy not installed")
+def test_update_onboard_identical_with_and_without_numpy(monkeypatch):
+    with_numpy = onboard_store(NUMPY_MIN_BATCH * 2)
+    update_onboard(with_numpy, list(range(NUMPY_MIN_BATCH * 2)), 30.0)
+    monkeypatch.setattr("passenger_store.np", None)
+    without_numpy = onboard_store(NUMPY_MIN_BATCH * 2)
+    update_onboard(without_numpy, list(range(NUMPY_MIN_BATCH * 2)), 30.0)
+    assert with_numpy.service_time == without_numpy.service_time
+
+
+@pytest.mark.parametrize("fleet_size", [1, 6])  # Riders stay below NUMPY_MIN_BATCH, or go well past it
+def test_batch_and_scalar_runs_agree(fleet_size):
+    config = SimulationConfig(fleet_size=fleet_size, bus_capacity=10, passenger_generation_rate=0.2,
+                              max_simulation_time=40, passenger_generation_cutoff=40)
+    batch = Simulation(config, seed=3)
+    scalar = Simulation(config, seed=3)
+    scalar.batch_update = False
+    most_riders = 0
+    while batch.step() and scalar.step():
+        most_riders = max(most_riders, len(batch.onboard_passengers))
+        assert batch.store.service_time == scalar.store.service_time
+
+    assert (most_riders >= NUMPY_MIN_BATCH) == (fleet_size > 1)
+    assert batch.summary() == scalar.summary()
@@ -0,0 +1,59 @@
+import pytest
+
+from events import EventSimulation
+from simulation import ARRIVAL_TOLERANCE, Simulation, SimulationConfig
+
+pytest.importorskip("numpy")
+from replay import TraceReplay  # noqa: E402
+
+CONFIG = SimulationConfig(fleet_size=3, routes=[[0, 1, 2, 3, 4], [4, 2, 0]], bus_stops=[100, 300, 500, 800, 1100],
+                          bus_speed=140, max_simulation_time=90, passenger_generation_cutoff=80,
+                          passenger_generation_rate=0.05)
+TIMES = [0.5, 12, 31.25, 47.3, 60, 89.9]
+
+
+def snapshot(simulation):
+    """What a replay at the simulation's current time should rebuild"""
+    return {
+        "events": simulation.trace.count,
+        "waiting": [passenger.index for queue in simulation.stop_queues for passenger in queue],
+        "riding": {bus.id: sorted(passenger.index for passenger in bus.passengers) for bus in simulation.buses},
+        "buses": [(bus.state, bus.current_stop, bus.x) for bus in simulation.buses],
+    }
+
+
+@pytest.mark.parametrize("engine", [Simulation, EventSimulation])
+def test_replay_rebuilds_the_run_at_any_time(engine, tmp_path):
+    path = str(tmp_path / "run.npy")
+    simulation = engine(CONFIG, seed=4, trace_path=path)
+    expected = {}
+    for time in TIMES:
+        simulation.run_until(time)
+        expected[simulation.time] = snapshot(simulation)
+    simulation.run_headless()
+    simulation.close()
+
+    replay = TraceReplay(path)  # Stops and speed from the configuration saved with the trace
+    for time, seen in expected.items():
+        assert replay.seek(time) == seen["events"]
+        waiting = replay.waiting_at(time).tolist()
+        assert sorted(waiting) == sorted(seen["waiting"])
+        riding = replay.riding_at(time).tolist()
+        assert {bus: sorted(index for index in riding if replay.bus_id[index] == bus)
+                for bus in range(replay.bus_count)} == seen["riding"]
+        for track, (state, stop, x) in zip(replay.tracks, seen["buses"]):
+            replayed_x, replayed_state, replayed_stop, _, _ = track.state_at(time)
+            assert (replayed_state, replayed_stop) == (state, stop)
+            assert replayed_x == pytest.approx(x, abs=ARRIVAL_TOLERANCE)
+
+
+def test_replay_needs_the_stops_of_a_trace_saved_without_them(tmp_path):
+    path = str(tmp_path / "run.npy")
+    simulation = Simulation(CONFIG, seed=4, trace_path=path)
+    simulation.run_headless()
+    simulation.close()
+    (tmp_path / "run.npy.json").unlink()
+
+    with pytest.raises(ValueError):
+        TraceReplay(path)
+    assert TraceReplay(path, CONFIG.bus_stops).bus_count == CONFIG.fleet_size
@@ -0,0 +1,40 @@
+import math
+
+import pytest
+
+from routes import RouteModel
+
+BUS_STOPS = [100, 300, 500, 800, 1100]
+
+
+def model(routes):
+    return RouteModel(BUS_STOPS, routes, bus_speed=100, bus_stop_time=2, arrival_tolerance=5)
+
+
+def test_two_routes_sharing_a_stop():
+    routes = model([[0, 1, 2], [4, 3, 2]])
+
+    assert routes.destinations == [[1, 2], [0, 2], [0, 1, 3, 4], [2, 4], [2, 3]]
+    assert routes.ride_time(0, 1) == pytest.approx(1.95)
+    assert routes.ride_time(0, 2) == pytest.approx(1.95 + 2 + 1.95)  # Dwell at stop 1 on the way
+    assert routes.ride_time(2, 0) == pytest.approx(3.95)  # Straight back on the loop
+    assert routes.ride_time(1, 0) == pytest.approx(1.95 + 2 + 3.95)
+    assert routes.ride_time(2, 3) == pytest.approx(5.95 + 2 + 2.95)  # Round by stop 4
+    assert routes.ride_time(4, 2) == pytest.approx(2.95 + 2 + 2.95)
+    assert math.isinf(routes.ride_time(0, 3))  # Would need a change of bus at stop 2
+    assert math.isinf(routes.ride_time(2, 2))
+
+
+def test_quickest_route_wins_where_several_connect_two_stops():
+    routes = model([[0, 1, 2, 3, 4], [4, 2, 0]])
+
+    assert routes.ride_time(0, 2) == pytest.approx(1.95 + 2 + 1.95)  # The loop beats going round by stop 4
+    assert routes.ride_time(4, 2) == pytest.approx(5.95)  # The express beats the loop back through stop 0
+    assert routes.ride_time(2, 0) == pytest.approx(3.95)
+    assert all(len(reachable) == 4 for reachable in routes.destinations)
+
+
+def test_leg_time_stops_short_by_the_arrival_tolerance():
+    routes = model([[0, 1]])
+    assert routes.leg_time(0, 1) == routes.leg_time(1, 0) == pytest.approx(1.95)
+    assert RouteModel([0, 3], [[0, 1]], 100, 2, arrival_tolerance=5).leg_time(0, 1) == 0
@@ -0,0 +1,96 @@
+import math
+import random
+
+import pytest
+
+from stats import LogHistogram, PassengerStats, RunningStats, np
+
+
+def sample(count=5000, seed=1):
+    rng = random.Random(seed)
+    return [0.05 + rng.expovariate(0.2) for _ in range(count)]
+
+
+def exact_quantile(values, q):
+    """Nearest-rank quantile, the value LogHistogram.quantile() looks up the bucket of"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+@pytest.mark.parametrize("q", [0.01, 0.25, 0.5, 0.9, 0.99, 1.0])
+def test_quantile_within_half_the_bucket_width(q):
+    values = sample()
+    histogram = LogHistogram(precision=0.01)
+    for value in values:
+        histogram.add(value)
+    exact = exact_quantile(values, q)
+    assert abs(histogram.quantile(q) - exact) / exact <= 0.005
+
+
+def test_quantile_of_empty_histogram_is_zero():
+    assert LogHistogram().quantile(0.5) == 0.0
+
+
+def test_running_stats_match_the_statistics_module():
+    values = sample(200)
+    stats = RunningStats()
+    for value in values:
+        stats.add(value)
+    assert stats.mean == pytest.approx(sum(values) / len(values))
+    assert stats.variance == pytest.approx(sum((v - stats.mean) ** 2 for v in values) / (len(values) - 1))
+    assert (stats.min, stats.max) == (min(values), max(values))
+
+
+@pytest.mark.parametrize("numpy", [True, False])
+def test_batches_merge_like_sequential_adds(monkeypatch, numpy):
+    if numpy and np is None:
+        pytest.skip("NumPy not installed")
+    if not numpy:
+        monkeypatch.setattr("stats.np", None)
+    values = sample(3000)
+    sequential, batched = RunningStats(), RunningStats()
+    sequential_histogram, batched_histogram = LogHistogram(), LogHistogram()
+    for value in values:
+        sequential.add(value)
+        sequential_histogram.add(value)
+    # Uneven chunks, including an empty one, folded into running accumulators
+    for start, end in [(0, 1), (1, 1), (1, 700), (700, 2999), (2999, 3000)]:
+        batched.add_batch(values[start:end])
+        batched_histogram.add_batch(values[start:end])
+
+    assert batched.count == sequential.count
+    assert batched.mean == pytest.approx(sequential.mean, rel=1e-12)
+    assert batched.variance == pytest.approx(sequential.variance, rel=1e-9)
+    assert (batched.min, batched.max) == (sequential.min, sequential.max)
+    assert batched_histogram.counts == sequential_histogram.counts
+    assert batched_histogram.count == sequential_histogram.count
+
+
+def test_complete_batch_matches_complete():
+    rng = random.Random(2)
+
+    class Finished:
+        def __init__(self):
+            self.arrival_time = rng.uniform(0, 20)
+            self.start_time = self.arrival_time + rng.uniform(0, 5)
+            self.completion_time = self.start_time + rng.uniform(1, 10)
+            self.wait_time = self.start_time - self.arrival_time
+            self.ride_time = self.completion_time - self.start_time
+            self.turnaround_time = self.completion_time - self.arrival_time
+
+    passengers = [Finished() for _ in range(100)]
+    one_by_one, batched = PassengerStats(), PassengerStats()
+    for passenger in passengers:
+        one_by_one.complete(passenger)
+    batched.complete_batch({
+        "wait_time": [p.wait_time for p in passengers],
+        "response_time": [max(0, p.start_time - p.arrival_time) for p in passengers],
+        "ride_time": [p.ride_time for p in passengers],
+        "turnaround_time": [p.turnaround_time for p in passengers],
+    })
+
+    assert batched.completed == one_by_one.completed
+    for name, stats in one_by_one.metrics.items():
+        assert batched.metrics[name].mean == pytest.approx(stats.mean)
+        assert batched.metrics[name].stdev == pytest.approx(stats.stdev)
+    assert batched.percentiles() == one_by_one.percentiles()